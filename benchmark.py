@@ -0,0 +1,274 @@
+"""
+Inference benchmark
+Runs a fixed set of images sampled from train/ through every available
+inference path and reports latency percentiles, throughput, peak RSS and
+cold-start time.
+
+Paths:
+    predict   - model.predict (what Classifier.predict uses today)
+    call      - direct model call, model(x, training=False)
+    function  - the compiled tf.function behind Classifier.predict_batch
+    tflite    - every *.tflite file found in the model directory
+
+Each (model, path, thread configuration) runs in a fresh Python process:
+TensorFlow's intra-op/inter-op thread pools can only be set before the
+first op runs, and a fresh process also gives honest cold-start and peak
+RSS numbers. Timings cover the model call on already scaled float32
+batches; image decoding and resizing are not included.
+
+Usage:
+    python benchmark.py                                 # ImageNet MobileNetV2 + docs/model + result/N
+    python benchmark.py --models docs/model --batch-sizes 1 8 32 --threads 1 4
+    python benchmark.py --out benchmark_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+TRAIN_DIR = Path(__file__).parent / "train"
+DEFAULT_MODELS = ["imagenet", "docs/model", "result/1", "result/2", "result/3", "result/4"]
+KERAS_PATHS = ("predict", "call", "function")
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+INPUT_SIZE = (224, 224)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if unavailable)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def sample_images(train_dir, count, seed=0):
+    """Fixed, reproducible sample of train/ images as uint8 RGB (N, 224, 224, 3)"""
+    from PIL import Image
+
+    paths = sorted(p for p in Path(train_dir).glob('*/*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not paths:
+        raise FileNotFoundError(f"No images found under {train_dir}")
+    random.Random(seed).shuffle(paths)
+    return np.stack([
+        np.asarray(Image.open(p).convert('RGB').resize(INPUT_SIZE), dtype=np.uint8)
+        for p in paths[:count]
+    ])
+
+
+def percentiles(latencies):
+    ms = np.asarray(latencies) * 1000
+    return {f"p{q}_ms": float(np.percentile(ms, q)) for q in (50, 95, 99)}
+
+
+def run_config(config):
+    """
+    Worker: loads one model on one path with one thread configuration and
+    times every batch size. Runs in its own process (see module docstring).
+    """
+    start = time.perf_counter()
+
+    # TensorFlow is only imported on the Keras paths, so the TFLite rows' peak RSS and
+    # cold start do not include it (unless tflite_runtime is missing and TFLite falls back to it)
+    if config["path"] != "tflite":
+        import tensorflow as tf
+        if config["intra_op"]:
+            tf.config.threading.set_intra_op_parallelism_threads(config["intra_op"])
+        if config["inter_op"]:
+            tf.config.threading.set_inter_op_parallelism_threads(config["inter_op"])
+
+    from classifier import Classifier
+
+    model_dir = None if config["model"] == "imagenet" else config["model"]
+    if config["path"] == "tflite":
+        classifier = Classifier(model_dir, engine="tflite", tflite_path=config["tflite"],
+                                num_threads=config["intra_op"])
+        run = classifier.tflite.run
+    else:
+        classifier = Classifier(model_dir)
+        run = {
+            "predict": lambda x: classifier.model.predict(x, verbose=0),
+            "call": lambda x: np.asarray(classifier.model(x, training=False)),
+            "function": lambda x: classifier._forward(tf.constant(x)).numpy(),
+        }[config["path"]]
+    load_s = time.perf_counter() - start
+
+    images = classifier._scale_input(sample_images(config["train_dir"], config["samples"]).astype(np.float32))
+
+    first = time.perf_counter()
+    run(images[:1])
+    first_s = time.perf_counter() - first
+
+    results = []
+    for batch_size in config["batch_sizes"]:
+        batches = [images[i:i + batch_size] for i in range(0, len(images) - batch_size + 1, batch_size)]
+        if not batches:
+            batches = [np.resize(images, (batch_size,) + images.shape[1:])]
+
+        for i in range(config["warmup"]):
+            run(batches[i % len(batches)])
+
+        latencies = []
+        for i in range(config["runs"]):
+            t = time.perf_counter()
+            run(batches[i % len(batches)])
+            latencies.append(time.perf_counter() - t)
+
+        results.append({
+            "batch_size": batch_size,
+            **percentiles(latencies),
+            "throughput_ips": batch_size * len(latencies) / sum(latencies),
+        })
+
+    if config["path"] == "tflite":
+        runtime = {"tflite_runtime": type(classifier.tflite.interpreter).__module__}
+    else:
+        runtime = {"tensorflow": tf.__version__}
+    return {
+        **runtime,
+        "load_s": load_s,
+        "first_inference_s": first_s,
+        "cold_start_s": load_s + first_s,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+
+
+def spawn(config):
+    """Runs one configuration in a fresh interpreter and returns its JSON result"""
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", json.dumps(config)],
+        capture_output=True, text=True,
+        env={**os.environ, "TF_CPP_MIN_LOG_LEVEL": "2"},
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        stderr = proc.stderr.strip().splitlines()
+        detail = " | ".join(stderr[-3:]) if stderr else "no output"
+        return {"error": f"worker exited with code {proc.returncode}: {detail}"}
+    try:
+        return json.loads(lines[-1])
+    except json.JSONDecodeError:
+        return {"error": f"worker printed no result: {lines[-1]}"}
+
+
+def model_version(model):
+    if model == "imagenet":
+        return "imagenet"
+    import tfjs_model
+    try:
+        return tfjs_model.model_version(model)
+    except FileNotFoundError:
+        return None
+
+
+def print_table(rows):
+    header = f"{'model':<12} {'path':<18} {'intra':>5} {'inter':>5} {'batch':>5} " \
+             f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'img/s':>8} {'RSS MB':>7} {'cold s':>7}"
+    print("\n" + header)
+    print("-" * len(header))
+    for row in rows:
+        name = row["path"] if row["path"] != "tflite" else f"tflite:{Path(row['tflite']).stem}"
+        prefix = f"{row['model']:<12} {name:<18} {row['intra_op'] or '-':>5} {row['inter_op'] or '-':>5}"
+        if "error" in row:
+            print(f"{prefix}  ❌ {row['error']}")
+            continue
+        rss = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] is not None else "-"
+        for r in row["results"]:
+            print(f"{prefix} {r['batch_size']:>5} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                  f"{r['throughput_ips']:>8.1f} {rss:>7} {row['cold_start_s']:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inference paths, batch sizes and thread counts")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS,
+                        help="'imagenet' and/or TF.js model directories")
+    parser.add_argument("--paths", nargs="+", default=list(KERAS_PATHS) + ["tflite"],
+                        choices=list(KERAS_PATHS) + ["tflite"])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, os.cpu_count() or 1],
+                        help="intra-op thread counts (TFLite: interpreter threads)")
+    parser.add_argument("--inter-op", nargs="+", type=int, default=[1, 2],
+                        help="inter-op thread counts (TensorFlow paths only)")
+    parser.add_argument("--samples", type=int, default=64, help="images sampled from train/")
+    parser.add_argument("--runs", type=int, default=30, help="timed runs per batch size")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--train-dir", default=str(TRAIN_DIR))
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_config(json.loads(args.worker))))
+        return
+
+    base = {
+        "batch_sizes": sorted(set(args.batch_sizes)),
+        "samples": args.samples,
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "train_dir": args.train_dir,
+    }
+    configs = []
+    for model in args.models:
+        if model != "imagenet" and not (Path(model) / "model.json").exists():
+            print(f"⚠️ Skipping {model}: no model.json")
+            continue
+        for path in args.paths:
+            if path == "tflite":
+                tflite_files = [] if model == "imagenet" else sorted(Path(model).glob("*.tflite"))
+                for tflite in tflite_files:
+                    for intra in sorted(set(args.threads)):
+                        configs.append({**base, "model": model, "path": path, "tflite": str(tflite),
+                                        "intra_op": intra, "inter_op": None})
+                continue
+            for intra in sorted(set(args.threads)):
+                for inter in sorted(set(args.inter_op)):
+                    configs.append({**base, "model": model, "path": path, "tflite": None,
+                                    "intra_op": intra, "inter_op": inter})
+
+    print(f"Running {len(configs)} configurations ({len(base['batch_sizes'])} batch sizes each)...")
+    rows = []
+    for i, config in enumerate(configs, 1):
+        label = config["tflite"] or config["path"]
+        print(f"  [{i}/{len(configs)}] {config['model']} {label} intra={config['intra_op']} inter={config['inter_op']}")
+        result = spawn(config)
+        rows.append({key: config[key] for key in ("model", "path", "tflite", "intra_op", "inter_op")} | result)
+
+    report = {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "model_versions": {model: model_version(model) for model in args.models
+                           if model == "imagenet" or (Path(model) / "model.json").exists()},
+        "settings": base,
+        "rows": rows,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print_table(rows)
+    print(f"\n✅ Results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Headless bulk classification
+Classifies every image under one or more directories / glob patterns and
+streams one record per image (label, score, full score vector, model
+version) to a JSONL or CSV file.
+
+- Decoding and resizing run in a process pool, one chunk of images per task
+- Each decoded chunk is classified with one batched forward pass
+- Records are appended and flushed per batch; re-running the same command
+  resumes after the last completed record (a half-written last line from a
+  crash is discarded)
+
+Usage:
+    python bulk_classify.py train/ --out audit.jsonl
+    python bulk_classify.py "captures/2024-06-01/**/*.jpg" --model docs/model --out audit.csv
+    python bulk_classify.py captures/ --model docs/model --engine tflite --workers 8 --batch-size 64
+"""
+
+import os
+import csv
+import glob
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from classifier import Classifier, INPUT_SIZE
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+CSV_FIELDS = ["path", "label", "score", "is_recyclable", "model_version", "scores", "error"]
+
+
+def find_images(inputs):
+    """Expands directories (recursively), glob patterns and single files into a sorted, de-duplicated list"""
+    found = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = path.rglob('*')
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = (Path(p) for p in glob.glob(item, recursive=True))
+        found.update(p.as_posix() for p in candidates if p.suffix.lower() in IMAGE_EXTENSIONS and p.is_file())
+    return sorted(found)
+
+
+def decode_chunk(paths):
+    """
+    Worker: decodes and resizes a chunk of images to INPUT_SIZE RGB uint8.
+    Returns (paths that decoded, stacked images, {path: error}).
+    """
+    ok, images, errors = [], [], {}
+    for path in paths:
+        try:
+            # imdecode(fromfile) also handles non-ASCII paths on Windows
+            frame = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError("cannot decode image")
+            images.append(cv2.cvtColor(cv2.resize(frame, INPUT_SIZE), cv2.COLOR_BGR2RGB))
+            ok.append(path)
+        except Exception as e:
+            errors[path] = str(e)
+    if images:
+        images = np.stack(images)
+    else:
+        images = np.empty((0, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+    return ok, images, errors
+
+
+def decode_stream(paths, batch_size, workers):
+    """
+    Yields decoded chunks in input order while keeping at most 2 chunks per
+    worker in flight, so memory stays bounded however many images there are.
+    """
+    chunks = (paths[i:i + batch_size] for i in range(0, len(paths), batch_size))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(decode_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _truncate_partial_line(path):
+    """Drops a half-written last line left by a crash"""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            f.truncate(end)
+
+
+def completed_records(path):
+    """Paths already present in an existing output file, and the model versions they were made with"""
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return set(), set()
+    _truncate_partial_line(path)
+
+    done, versions = set(), set()
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for record in records:
+            done.add(record["path"])
+            if record.get("model_version"):
+                versions.add(record["model_version"])
+    return done, versions
+
+
+class RecordWriter:
+    """Appends records to a JSONL or CSV file and flushes after every batch"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.csv = self.path.suffix.lower() == '.csv'
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self.file = open(self.path, 'a', encoding='utf-8', newline='')
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, records):
+        for record in records:
+            if self.csv:
+                row = dict(record)
+                if "scores" in row:
+                    row["scores"] = json.dumps(row["scores"])
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify image directories / globs into a resumable JSONL or CSV file")
+    parser.add_argument("inputs", nargs="+", help="Directories (searched recursively), glob patterns or files")
+    parser.add_argument("--out", default="classifications.jsonl", help="Output file (.jsonl or .csv)")
+    parser.add_argument("--model", metavar="DIR",
+                        help="Use our trained TF.js model (e.g. docs/model) instead of ImageNet MobileNetV2")
+    parser.add_argument("--engine", choices=["keras", "tflite"], default="keras")
+    parser.add_argument("--tflite", metavar="FILE",
+                        help="TFLite model for --engine tflite (default: <model>/model_int8.tflite)")
+    parser.add_argument("--threads", type=int, help="CPU threads for the tflite engine")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Decode processes")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--restart", action="store_true", help="Discard an existing output file instead of resuming")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.out):
+        os.remove(args.out)
+
+    paths = find_images(args.inputs)
+    done, versions = completed_records(args.out)
+    todo = [p for p in paths if p not in done]
+    print(f"Found {len(paths)} images, {len(paths) - len(todo)} already in {args.out}, {len(todo)} to classify.")
+    if not todo:
+        return
+
+    classifier = Classifier(model_dir=args.model, engine=args.engine,
+                            tflite_path=args.tflite, num_threads=args.threads)
+    if versions and versions != {classifier.version}:
+        print(f"Warning: {args.out} contains results from model version(s) {sorted(versions)}, "
+              f"now running {classifier.version}. Use --restart to start over.")
+
+    writer = RecordWriter(args.out)
+    processed = 0
+    inference_time = 0.0
+    start = time.perf_counter()
+    try:
+        for ok, images, errors in decode_stream(todo, args.batch_size, args.workers):
+            records = [{"path": p, "model_version": classifier.version, "error": e} for p, e in errors.items()]
+            if ok:
+                t = time.perf_counter()
+                results, scores = classifier.predict_rgb_batch(images, return_scores=True)
+                inference_time += time.perf_counter() - t
+                for path, result, vector in zip(ok, results, scores):
+                    records.append({
+                        "path": path,
+                        "label": result["label"],
+                        "score": result["score"],
+                        "is_recyclable": result["is_recyclable"],
+                        "model_version": classifier.version,
+                        "scores": [round(float(s), 6) for s in vector],
+                    })
+            writer.write(records)
+
+            processed += len(ok) + len(errors)
+            elapsed = time.perf_counter() - start
+            print(f"  {processed}/{len(todo)} images, {processed / elapsed:.1f} images/s", end="\r")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nDone: {processed} images in {elapsed:.1f}s ({processed / elapsed:.1f} images/s, "
+          f"inference {inference_time:.1f}s). Results: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,117 @@
-import tensorflow as tf
-from tensorflow.keras.applications.mobilenet_v2 import MobileNetV2, preprocess_input, decode_predictions
-from tensorflow.keras.preprocessing import image
+# TensorFlow / Keras are imported lazily (see Classifier.__init__): importing
+# them dominates cold start, and the tflite engine does not need them at all.
+import os
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+
 import numpy as np
 import cv2
+import hashlib
+from pathlib import Path
+
+import tfjs_model
+from tflite_engine import TFLiteEngine
+from profiler import NULL_STAGE
+from prediction_cache import PredictionCache
+
+INPUT_SIZE = (224, 224)
+
+ENGINES = ("keras", "tflite")
+
+# Same file (and Keras cache location) that MobileNetV2(weights='imagenet') uses
+IMAGENET_WEIGHTS = "mobilenet_v2_weights_tf_dim_ordering_tf_kernels_1.0_224.h5"
+IMAGENET_WEIGHTS_URL = "https://storage.googleapis.com/tensorflow/keras-applications/mobilenet_v2/"
+
+# Pre-serialized, pre-traced forward passes for fast start, keyed by model version
+MODEL_CACHE_DIR = Path(__file__).parent / ".model_cache"
+
+# Custom (6-class) model: same threshold as RECOGNITION.CONFIDENCE_THRESHOLD in docs/js/config.js
+CONFIDENCE_THRESHOLD = 0.7
+# Custom model classes that are not recyclable
+NON_RECYCLABLE_LABELS = ['garbage']
+
+
+def file_digest(path):
+    """Short SHA-256 of a model file, used as the model version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
 
 class Classifier:
-    def __init__(self):
-        # Load the pre-trained MobileNetV2 model
-        print("Loading MobileNetV2 model...")
-        self.model = MobileNetV2(weights='imagenet')
+    def __init__(self, model_dir=None, engine="keras", tflite_path=None, num_threads=None, profiler=None,
+                 cache=None, cache_size=1024, cache_dir=None, fast_start=False, model_cache_dir=MODEL_CACHE_DIR,
+                 graph_preprocess=False):
+        """
+        model_dir: optional TF.js layers-model directory (e.g. docs/model, result/2).
+        If given, the project's own trained model is used instead of the ImageNet MobileNetV2.
+        engine: "keras" (TensorFlow, float32) or "tflite" (TFLite interpreter with XNNPACK).
+        tflite_path: .tflite file for the tflite engine (default: <model_dir>/model_int8.tflite).
+        num_threads: CPU threads for the tflite engine.
+        profiler: optional profiler.Profiler that records per-stage timings
+        (preprocess, inference, postprocess and the whole predict call).
+        cache: None, "exact" or "perceptual" - reuse the scores of inputs seen before
+        (see prediction_cache.py). cache_size: in-memory entries (LRU).
+        cache_dir: optional directory for a persistent cache tier.
+        fast_start: load the traced forward pass from model_cache_dir (a SavedModel
+        keyed by model version) instead of rebuilding the Keras model; it is written
+        there on the first run. Startup phase timings are kept in self.startup.
+        graph_preprocess: predict() passes the raw uint8 BGR frame to the graph, which
+        resizes, swaps channels and scales it (keras engine, without cache).
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        if engine == "tflite" and not (model_dir or tflite_path):
+            raise ValueError("The tflite engine needs model_dir or tflite_path (labels come from the model directory)")
+
+        self.model_dir = model_dir
+        self.engine = engine
+        self.labels = None
+        self.tflite = None
+        self.profiler = profiler
+        self.model = None
+        self.startup = {}
+        self.ready = threading.Event()
+
+        if engine == "tflite":
+            if tflite_path is None:
+                tflite_path = Path(model_dir) / "model_int8.tflite"
+            if model_dir is None:
+                model_dir = Path(tflite_path).parent
+            print(f"Loading TFLite model {tflite_path}...")
+            with self._phase("load_model"):
+                self.tflite = TFLiteEngine(tflite_path, num_threads=num_threads)
+            self.version = "tflite-" + file_digest(tflite_path)
+            self.labels = tfjs_model.load_labels(model_dir)
+            self.input_scale, self.input_offset = tfjs_model.input_scaling(model_dir)
+        elif model_dir:
+            self.version = tfjs_model.model_version(model_dir)
+            self.labels = tfjs_model.load_labels(model_dir)
+            self.input_scale, self.input_offset = tfjs_model.input_scaling(model_dir)
+            if not (fast_start and self._load_cached_forward(model_cache_dir)):
+                print(f"Loading custom model from {model_dir}...")
+                with self._phase("load_model"):
+                    self.model = tfjs_model.load_layers_model(model_dir)
+        else:
+            # Versioned by the weights file, so a different download never reuses cached entries
+            weights_path = self._imagenet_weights()
+            self.version = "imagenet-mobilenet_v2-" + file_digest(weights_path)
+            # MobileNetV2 preprocess_input: [0, 255] -> [-1, 1]
+            self.input_scale, self.input_offset = 1 / 127.5, -1.0
+            if not (fast_start and self._load_cached_forward(model_cache_dir)):
+                # Load the pre-trained MobileNetV2 model
+                print("Loading MobileNetV2 model...")
+                with self._phase("load_model"):
+                    from tensorflow.keras.applications import MobileNetV2
+                    self.model = MobileNetV2(weights=str(weights_path))
         print("Model loaded.")
+
+        # Keys are scoped to self.version, so a different model never reuses these scores
+        self.cache = PredictionCache(self.version, cache, cache_size, cache_dir) if cache else None
         
         # Define target labels that we consider as "Bottle" or "Recyclable"
         # Reference: ImageNet labels
@@ -25,29 +127,306 @@ class Classifier:
             'packet', # Juice packet
         ]
 
+        # Compiled forward pass for batched inference. The signature is fixed
+        # (only the batch dimension may vary) so it is traced exactly once and
+        # every call skips the per-call setup that Model.predict pays.
+        if self.model is not None:
+            import tensorflow as tf
+            self._forward = tf.function(
+                lambda x: self.model(x, training=False),
+                input_signature=[tf.TensorSpec([None, INPUT_SIZE[1], INPUT_SIZE[0], 3], tf.float32)],
+            )
+            if fast_start:
+                self._save_cached_forward(model_cache_dir)
+
+        # Reused buffers: predict() writes the resized, RGB and scaled input into these
+        # instead of allocating new arrays for every frame. Like the rest of the
+        # Classifier, they assume one caller at a time.
+        self._resized = np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._resized)
+        self._input = np.empty((1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+        # Preallocated RGB and input tensors, grown on demand by predict_batch
+        self._rgb_batch = np.empty((0, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+        self._batch_buffer = np.empty((0, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+
+        self._forward_bgr = None
+        if graph_preprocess and not self.tflite:
+            self._forward_bgr = self._make_bgr_forward()
+
+    def _imagenet_weights(self):
+        """Path of the ImageNet MobileNetV2 weights in the Keras cache (downloaded on first use)"""
+        with self._phase("import_tensorflow"):
+            from tensorflow.keras.utils import get_file
+        return Path(get_file(IMAGENET_WEIGHTS, IMAGENET_WEIGHTS_URL + IMAGENET_WEIGHTS, cache_subdir="models"))
+
+    @contextmanager
+    def _phase(self, name):
+        """Records the duration of a startup phase in self.startup"""
+        start = time.perf_counter()
+        yield
+        self.startup[name] = self.startup.get(name, 0.0) + time.perf_counter() - start
+
+    def _model_cache_path(self, model_cache_dir):
+        with self._phase("import_tensorflow"):
+            import tensorflow as tf
+        return Path(model_cache_dir) / f"{self.version}-tf{tf.__version__}"
+
+    def _load_cached_forward(self, model_cache_dir):
+        """
+        Loads the pre-traced forward pass saved by _save_cached_forward.
+        Returns False if there is no cache entry for this model version.
+        """
+        path = self._model_cache_path(model_cache_dir)
+        if not path.exists():
+            return False
+        import tensorflow as tf
+        print(f"Loading cached model {path}...")
+        with self._phase("load_cached_model"):
+            # Keep a reference: the restored function only lives as long as its SavedModel
+            self._saved_model = tf.saved_model.load(str(path))
+            self._forward = self._saved_model.forward
+        return True
+
+    def _save_cached_forward(self, model_cache_dir):
+        """Serializes the traced forward pass (with its weights) for the next fast start"""
+        path = self._model_cache_path(model_cache_dir)
+        if path.exists():
+            return
+        import tensorflow as tf
+        tmp = path.with_name(f".{path.name}.tmp{os.getpid()}")
+        try:
+            with self._phase("save_cached_model"):
+                module = tf.Module()
+                module.model = self.model
+                module.forward = self._forward
+                tf.saved_model.save(module, str(tmp))
+                os.replace(tmp, path)
+            print(f"Cached model for fast start: {path}")
+        except Exception as e:
+            print(f"Warning: could not cache the model for fast start: {e}")
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _make_bgr_forward(self):
+        """
+        Forward pass that takes raw uint8 BGR frames of any size and does the
+        resize, BGR -> RGB swap and scaling inside the graph. Height and width are left
+        unspecified in the input signature, so it is traced once for all frame sizes.
+        """
+        import tensorflow as tf
+        scale, offset = self.input_scale, self.input_offset
+
+        @tf.function(input_signature=[tf.TensorSpec([None, None, None, 3], tf.uint8)])
+        def forward_bgr(frames):
+            x = tf.image.resize(frames, (INPUT_SIZE[1], INPUT_SIZE[0]))
+            x = tf.reverse(x, axis=[-1]) * scale + offset
+            return self._forward(x)
+
+        return forward_bgr
+
+    def warmup(self, background=False):
+        """
+        Runs one dummy inference so tracing, kernel selection and the label lookup
+        happen before the first real frame. With background=True it runs on a
+        daemon thread (e.g. while the camera opens); self.ready is set when done,
+        and callers must wait for it before their first predict (one caller at a time).
+        """
+        def run():
+            with self._phase("warmup"):
+                x = np.zeros((1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+                preds = self._run_batch(x)
+                if self._forward_bgr is not None:
+                    # predict() runs this graph instead; the frame size does not matter
+                    self._forward_bgr(np.zeros((1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8))
+                self._results(preds)
+            self.ready.set()
+
+        if background:
+            thread = threading.Thread(target=run, daemon=True)
+            thread.start()
+            return thread
+        run()
+
+    def _to_rgb(self, frame, out):
+        """Resizes a BGR frame to INPUT_SIZE and writes it as RGB into out, without new arrays"""
+        cv2.resize(frame, INPUT_SIZE, dst=self._resized)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=out)
+        return out
+
+    def _stage(self, name):
+        """Times a block as stage `name` if a profiler is attached (otherwise a shared no-op)"""
+        return self.profiler.stage(name) if self.profiler else NULL_STAGE
+
     def predict(self, frame):
         """
         Takes an OpenCV frame (BGR), preprocesses it, and returns the prediction result.
         """
-        # Resize frame to 224x224 as required by MobileNetV2
-        img = cv2.resize(frame, (224, 224))
-        
-        # Convert BGR (OpenCV) to RGB
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        
-        # Expand dimensions to match model input shape (1, 224, 224, 3)
-        x = np.expand_dims(img, axis=0)
-        
-        # Preprocess input (scaling, etc.)
-        x = preprocess_input(x)
-        
-        # Make prediction
-        preds = self.model.predict(x, verbose=0)
-        
-        # Decode predictions (Top 3)
-        decoded_preds = decode_predictions(preds, top=3)[0]
-        # decoded_preds structure: list of tuples (class_id, class_name, score)
-        
+        if self._forward_bgr is not None and not self.cache:
+            with self._stage("predict"):
+                # Resize, BGR -> RGB and scaling all run inside the graph
+                with self._stage("inference"):
+                    preds = self._forward_bgr(frame[None]).numpy()
+                with self._stage("postprocess"):
+                    return self._results(preds)[0]
+
+        with self._stage("predict"):
+            # One span for the whole preprocessing, so the stage records one sample per frame
+            with self._stage("preprocess"):
+                # Resize frame to 224x224 as required by MobileNetV2 and
+                # convert BGR (OpenCV) to RGB, into the reused buffers
+                img = self._to_rgb(frame, self._rgb)
+
+                # Model input shape (1, 224, 224, 3): uint8 -> float32 into the reused input tensor
+                x = self._input
+                x[0] = img
+
+                # Preprocess input (scaling, etc.) in place
+                x = self._scale_input(x)
+
+            if self.cache:
+                with self._stage("cache"):
+                    key = self.cache.key(img)
+                    cached = self.cache.get(key)
+                if cached is not None:
+                    with self._stage("postprocess"):
+                        return self._results(cached[None])[0]
+
+            # Make prediction
+            with self._stage("inference"):
+                # Same compiled forward pass (or TFLite engine) that warmup() prepares
+                preds = self._run_batch(x)
+
+            if self.cache:
+                self.cache.put(key, preds[0])
+
+            with self._stage("postprocess"):
+                return self._results(preds)[0]
+
+    def predict_batch(self, frames):
+        """
+        Classifies a list of OpenCV frames (BGR) with a single compiled forward pass.
+        Returns one result dict per frame, in the same format as predict().
+        """
+        if len(frames) == 0:
+            return []
+
+        with self._stage("predict"):
+            preds = self._batch_scores(frames, bgr=True)
+
+            with self._stage("postprocess"):
+                return self._results(preds)
+
+    def predict_rgb_batch(self, images, return_scores=False):
+        """
+        Classifies RGB images that are already resized to INPUT_SIZE, shape (N, 224, 224, 3)
+        (e.g. decoded and resized in worker processes). Returns result dicts in the same
+        format as predict(), and the raw score matrix as well if return_scores is True.
+        """
+        if len(images) == 0:
+            return ([], np.empty((0, 0), dtype=np.float32)) if return_scores else []
+
+        with self._stage("predict"):
+            preds = self._batch_scores(images)
+
+            with self._stage("postprocess"):
+                results = self._results(preds)
+        return (results, preds) if return_scores else results
+
+    def _batch_scores(self, images, bgr=False):
+        """
+        Score matrix for uint8 images: resized RGB images, or BGR frames of any size
+        if bgr is True. All preprocessing runs in one span into the preallocated input
+        tensor; cached images are then looked up and only the rest run as one batch.
+        """
+        n = len(images)
+        with self._stage("preprocess"):
+            if bgr:
+                if self._rgb_batch.shape[0] < n:
+                    self._rgb_batch = np.empty((n, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+                rgb = self._rgb_batch[:n]
+                for i, frame in enumerate(images):
+                    self._to_rgb(frame, rgb[i])
+                images = rgb
+
+            if self._batch_buffer.shape[0] < n:
+                self._batch_buffer = np.empty((n, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+            batch = self._batch_buffer[:n]
+            for i in range(n):
+                batch[i] = images[i]
+
+            # Scale to the model's input range in place
+            batch = self._scale_input(batch)
+
+        preds = [None] * n
+        keys = None
+        if self.cache:
+            with self._stage("cache"):
+                keys = [self.cache.key(img) for img in images]
+                preds = [self.cache.get(key) for key in keys]
+        todo = [i for i in range(n) if preds[i] is None]
+
+        if todo:
+            with self._stage("inference"):
+                out = self._run_batch(batch if len(todo) == n else batch[todo])
+
+            for j, i in enumerate(todo):
+                preds[i] = out[j]
+                if self.cache:
+                    self.cache.put(keys[i], out[j])
+
+        return np.stack(preds)
+
+    def _run_batch(self, batch):
+        """Runs a scaled float32 batch through the compiled forward pass or the TFLite engine"""
+        if self.tflite:
+            return self.tflite.run(batch)
+        return self._forward(batch).numpy()
+
+    def _scale_input(self, x):
+        """
+        Scales RGB pixels to the range the loaded model expects.
+        Float32 input is scaled in place.
+        """
+        x = x.astype(np.float32, copy=False)
+        x *= self.input_scale
+        x += self.input_offset
+        return x
+
+    def _results(self, preds):
+        """
+        Converts a batch of model outputs into result dicts.
+        """
+        if self.labels is None:
+            from tensorflow.keras.applications.mobilenet_v2 import decode_predictions
+            # Decode predictions (Top 3)
+            # decoded_preds structure: list of tuples (class_id, class_name, score)
+            return [self._build_result(decoded_preds) for decoded_preds in decode_predictions(preds, top=3)]
+        return [self._build_custom_result(scores) for scores in preds]
+
+    def _build_custom_result(self, scores):
+        """
+        Builds the result dict from the class scores of the custom model.
+        """
+        index = int(np.argmax(scores))
+        label = self.labels[index]
+        score = float(scores[index])
+
+        result = {
+            "label": label,
+            "score": score,
+            "is_recyclable": False,
+            "display_text": f"Other ({label}: {score:.2f})"
+        }
+
+        if label not in NON_RECYCLABLE_LABELS and score >= CONFIDENCE_THRESHOLD:
+            result["is_recyclable"] = True
+            result["display_text"] = f"RECYCLABLE: {label} ({score:.2f})"
+
+        return result
+
+    def _build_result(self, decoded_preds):
+        """
+        Builds the result dict from the decoded Top-3 predictions of one frame.
+        """
         # Check if the top prediction is in our target list
         top_pred = decoded_preds[0]
         label = top_pred[1]
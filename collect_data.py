@@ -18,11 +18,15 @@ TrashNet 類別 → 我們的類別:
     python collect_data.py
 """
 
+import io
 import os
 import shutil
+import hashlib
 import zipfile
 import requests
-from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path, PurePosixPath
 from PIL import Image
 
 # ===== 設定 =====
@@ -32,6 +36,9 @@ IMAGE_SIZE = (224, 224)
 
 # TrashNet GitHub 下載連結
 TRASHNET_URL = "https://github.com/garythung/trashnet/raw/master/data/dataset-resized.zip"
+# ZIP 的 SHA-256，下載完成後驗證；可用環境變數 TRASHNET_SHA256 指定
+# (尚未固定時只印出計算結果並警告，請把第一次下載印出的值填回這裡)
+TRASHNET_SHA256 = os.environ.get("TRASHNET_SHA256") or None
 
 # 類別映射: TrashNet → 我們的類別
 CATEGORY_MAPPING = {
@@ -46,115 +53,190 @@ CATEGORY_MAPPING = {
 # 每個類別最多取多少張
 MAX_PER_SOURCE = 80
 
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
 
-def download_trashnet():
-    """下載 TrashNet 資料集"""
-    zip_path = TEMP_DIR / "trashnet.zip"
+
+def sha256sum(path):
+    """計算檔案 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_trashnet(url=TRASHNET_URL, zip_path=None, expected_sha256=TRASHNET_SHA256):
+    """
+    下載 TrashNet 資料集
+    中斷後重新執行會從 .part 檔續傳 (HTTP Range)，完成後驗證 SHA-256 再改名為正式檔名。
+    """
+    zip_path = Path(zip_path) if zip_path else TEMP_DIR / "trashnet.zip"
+    part_path = zip_path.with_name(zip_path.name + ".part")
     
     if zip_path.exists():
         print("  ✓ 已有下載的 ZIP 檔案")
         return zip_path
     
-    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
     
     print("  📥 正在下載 TrashNet 資料集...")
-    print(f"     URL: {TRASHNET_URL}")
+    print(f"     URL: {url}")
     
     try:
-        response = requests.get(TRASHNET_URL, stream=True, timeout=120)
-        response.raise_for_status()
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        response = requests.get(url, stream=True, timeout=120, headers=headers)
         
-        total_size = int(response.headers.get('content-length', 0))
-        downloaded = 0
+        if response.status_code == 416:
+            # 伺服器表示 Range 超出檔案大小: .part 已是完整檔案
+            response.close()
+        else:
+            response.raise_for_status()
+            if offset and response.status_code == 206:
+                print(f"     從 {offset / 1024 / 1024:.1f} MB 續傳")
+                mode = 'ab'
+            else:
+                # 伺服器不支援 Range (回傳 200)，重新下載
+                offset = 0
+                mode = 'wb'
+            
+            total_size = int(response.headers.get('content-length', 0)) + offset
+            downloaded = offset
+            
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    if total_size > 0:
+                        progress = downloaded / total_size * 100
+                        print(f"     下載進度: {progress:.1f}%", end="\r")
+            
+            if total_size > offset and downloaded != total_size:
+                print(f"\n  ❌ 下載不完整 ({downloaded}/{total_size} bytes)，重新執行即可續傳")
+                return None
         
-        with open(zip_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-                downloaded += len(chunk)
-                if total_size > 0:
-                    progress = downloaded / total_size * 100
-                    print(f"     下載進度: {progress:.1f}%", end="\r")
+        # 驗證
+        checksum = sha256sum(part_path)
+        if expected_sha256 and checksum != expected_sha256.lower():
+            print(f"\n  ❌ SHA-256 不符: {checksum}")
+            part_path.unlink()
+            return None
+        if expected_sha256:
+            print(f"\n  🔒 SHA-256 驗證通過: {checksum}")
+        else:
+            print(f"\n  ⚠️ 未固定 SHA-256，無法驗證下載內容: {checksum}")
         
-        print(f"\n  ✅ 下載完成: {zip_path}")
+        os.replace(part_path, zip_path)
+        print(f"  ✅ 下載完成: {zip_path}")
         return zip_path
         
     except Exception as e:
-        print(f"  ❌ 下載失敗: {e}")
+        print(f"\n  ❌ 下載失敗: {e} (重新執行會從中斷處續傳)")
+        return None
+
+
+# ===== 影像處理 (在子行程中執行) =====
+_worker_zip = None
+
+
+def _init_worker(zip_path):
+    """每個子行程開一次 ZIP，直接從壓縮檔讀取成員"""
+    global _worker_zip
+    _worker_zip = zipfile.ZipFile(zip_path, 'r')
+
+
+def _convert_member(member, target_path):
+    """
+    讀取 ZIP 成員、轉 RGB、縮放並存成 JPEG。
+    先寫入暫存檔再 os.replace，中斷時不會留下半張圖片。
+    """
+    tmp_path = target_path.with_name(f".{target_path.name}.{os.getpid()}.tmp")
+    try:
+        img = Image.open(io.BytesIO(_worker_zip.read(member)))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img = img.resize(IMAGE_SIZE, Image.LANCZOS)
+        img.save(tmp_path, "JPEG", quality=90)
+        os.replace(tmp_path, target_path)
         return None
+    except Exception as e:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return f"{member}: {e}"
 
 
-def extract_and_organize():
-    """解壓縮並整理資料"""
-    zip_path = TEMP_DIR / "trashnet.zip"
-    extract_dir = TEMP_DIR / "extracted"
+def find_source_images(zip_ref):
+    """依來源類別整理 ZIP 內的圖片成員 (路徑形如 .../<類別>/<檔名>)"""
+    members = defaultdict(list)
+    for name in zip_ref.namelist():
+        path = PurePosixPath(name)
+        if path.suffix.lower() in IMAGE_EXTENSIONS and path.parent.name in CATEGORY_MAPPING:
+            # 略過 macOS 壓縮時產生的 __MACOSX/ 資源檔
+            if "__MACOSX" not in path.parts:
+                members[path.parent.name].append(name)
+    return {cat: sorted(names) for cat, names in members.items()}
+
+
+def extract_and_organize(zip_path=None, workers=None):
+    """直接從 ZIP 串流讀取並整理資料 (不解壓縮到磁碟，多行程平行處理)"""
+    zip_path = Path(zip_path) if zip_path else TEMP_DIR / "trashnet.zip"
     
     if not zip_path.exists():
         print("  ❌ 找不到 ZIP 檔案")
         return False
     
-    # 解壓縮
-    print("  📦 正在解壓縮...")
     with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+        sources = find_source_images(zip_ref)
     
-    # 找到實際的資料目錄
-    data_dir = None
-    for root, dirs, files in os.walk(extract_dir):
-        if any(cat in dirs for cat in CATEGORY_MAPPING.keys()):
-            data_dir = Path(root)
-            break
-    
-    if not data_dir:
+    if not sources:
         print("  ❌ 找不到資料目錄")
         return False
     
-    print(f"  📂 資料目錄: {data_dir}")
-    
     # 建立目標目錄
     for target_cat in set(CATEGORY_MAPPING.values()):
         (TRAIN_DIR / target_cat).mkdir(parents=True, exist_ok=True)
     
-    # 複製並調整圖片
+    # 規劃工作 (新檔名加上來源類別前綴避免覆蓋；已存在的略過)
     stats = {}
-    
+    jobs = []
     for source_cat, target_cat in CATEGORY_MAPPING.items():
-        source_dir = data_dir / source_cat
-        target_dir = TRAIN_DIR / target_cat
-        
-        if not source_dir.exists():
+        if source_cat not in sources:
             print(f"  ⚠ 找不到來源類別: {source_cat}")
             continue
         
-        images = list(source_dir.glob("*.jpg")) + list(source_dir.glob("*.jpeg")) + list(source_dir.glob("*.png"))
-        count = 0
-        
-        print(f"\n  📁 {source_cat} → {target_cat} ({len(images)} 張)")
+        members = sources[source_cat]
+        print(f"  📁 {source_cat} → {target_cat} ({len(members)} 張)")
+        stats[source_cat] = {"target": target_cat, "copied": 0, "skipped": 0, "failed": 0, "errors": []}
         
-        for img_path in images[:MAX_PER_SOURCE]:
-            try:
-                # 載入並調整大小
-                img = Image.open(img_path)
-                if img.mode != "RGB":
-                    img = img.convert("RGB")
-                img = img.resize(IMAGE_SIZE, Image.LANCZOS)
-                
-                # 新檔名 (加上來源類別前綴避免覆蓋)
-                new_name = f"{source_cat}_{img_path.name}"
-                if not new_name.endswith('.jpg'):
-                    new_name = new_name.rsplit('.', 1)[0] + '.jpg'
-                
-                target_path = target_dir / new_name
-                
-                if not target_path.exists():
-                    img.save(target_path, "JPEG", quality=90)
-                    count += 1
-                    print(f"    複製 {count}", end="\r")
-                    
-            except Exception as e:
-                pass
-        
-        stats[f"{source_cat}→{target_cat}"] = count
-        print(f"    ✅ 複製了 {count} 張")
+        for member in members[:MAX_PER_SOURCE]:
+            new_name = f"{source_cat}_{PurePosixPath(member).stem}.jpg"
+            target_path = TRAIN_DIR / target_cat / new_name
+            if target_path.exists():
+                stats[source_cat]["skipped"] += 1
+            else:
+                jobs.append((source_cat, member, target_path))
+    
+    print(f"\n  ⚙️ 平行處理 {len(jobs)} 張圖片 ({workers or os.cpu_count()} 個行程)...")
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(zip_path),)) as pool:
+        futures = {pool.submit(_convert_member, member, target_path): source_cat
+                   for source_cat, member, target_path in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            source_cat = futures[future]
+            error = future.result()
+            if error:
+                stats[source_cat]["failed"] += 1
+                stats[source_cat]["errors"].append(error)
+            else:
+                stats[source_cat]["copied"] += 1
+            print(f"    處理 {done}/{len(jobs)}", end="\r")
+    
+    print()
+    for source_cat, s in stats.items():
+        status = "✅" if s["failed"] == 0 else "⚠️"
+        print(f"  {status} {source_cat}→{s['target']}: 複製 {s['copied']}、已存在 {s['skipped']}、失敗 {s['failed']}")
+        for error in s["errors"][:3]:
+            print(f"       {error}")
     
     return True
 
@@ -198,25 +280,34 @@ def create_missing_folders():
 
 
 def count_images():
-    """統計各類別圖片數量"""
+    """統計各類別圖片數量 (依 train/.manifest.json，重複圖片只算一次)"""
+    from dataset_manifest import Manifest
+    
     print("\n" + "="*60)
     print("📊 訓練資料統計")
     print("="*60)
     
+    manifest = Manifest(TRAIN_DIR)
+    manifest.update()
+    unique = manifest.deduplicated()
+    
     categories = ["garbage", "paper", "paper_container", "tetra_pak", "metal_can", "plastic"]
     total = 0
     
     for cat in categories:
         folder = TRAIN_DIR / cat
         if folder.exists():
-            count = len([f for f in folder.glob("*.jpg")])
+            count = sum(1 for e in unique if e["label"] == cat)
             status = "✅" if count >= 30 else "⚠️ 需補充" if count > 0 else "❌ 空"
             print(f"  {status} {cat}: {count} 張")
             total += count
         else:
             print(f"  ❌ {cat}: 資料夾不存在")
     
+    duplicates = len(manifest.entries) - len(unique)
     print(f"\n  總計: {total} 張")
+    if duplicates:
+        print(f"  (另有 {duplicates} 張重複或無法解碼，執行 python dataset_manifest.py 查看)")
     return total
 
 
@@ -241,8 +332,8 @@ def main():
         print("❌ 下載失敗，請檢查網路連線")
         return
     
-    # 2. 解壓縮並整理
-    print("\n📦 步驟 2: 解壓縮並整理資料")
+    # 2. 從 ZIP 讀取並整理
+    print("\n📦 步驟 2: 從 ZIP 讀取並整理資料")
     if not extract_and_organize():
         print("❌ 整理失敗")
         return
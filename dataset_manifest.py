@@ -0,0 +1,234 @@
+"""
+SmartRecycle AI - train/ 資料集清單 (manifest)
+記錄每張圖片的路徑、大小、修改時間、內容雜湊 (SHA-256)、感知雜湊 (pHash)、
+解碼後尺寸與類別，並以增量方式更新: 大小與修改時間沒變的檔案不重新計算。
+
+同一張照片可能以不同檔名出現多次 (例如 collect_data.py 的 "<來源類別>_" 前綴)，
+重複圖片會浪費訓練時間，也會同時落在訓練集與驗證集造成洩漏。
+near_duplicates() 找出內容相同或 pHash 相近的圖片群組，
+deduplicated() 回傳每組只保留一張的清單，供訓練資料管線使用。
+
+使用方式:
+    python dataset_manifest.py                  # 更新清單並列出重複圖片
+    python dataset_manifest.py --max-distance 6 # 放寬近似重複的門檻
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+TRAIN_DIR = Path(__file__).parent / "train"
+MANIFEST_NAME = ".manifest.json"
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# pHash 漢明距離 <= 此值視為近似重複 (64 bits)
+MAX_DISTANCE = 4
+
+PHASH_SIZE = 32
+PHASH_BITS = 8
+
+
+def _dct_matrix(n):
+    """DCT-II 轉換矩陣"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def phash(img):
+    """
+    感知雜湊: 灰階 32x32 -> 2D DCT -> 取左上 8x8 低頻係數，大於中位數為 1。
+    回傳 16 字元十六進位字串 (64 bits)。
+    """
+    gray = np.asarray(img.convert("L").resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    coeffs = (_DCT @ gray @ _DCT.T)[:PHASH_BITS, :PHASH_BITS].flatten()
+    # 直流分量 (整體亮度) 不參與中位數
+    bits = coeffs > np.median(coeffs[1:])
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+
+def sha256sum(path):
+    """檔案內容 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hamming_matrix(hashes, start, stop):
+    """hashes[start:stop] 與所有 hashes 的 pHash 漢明距離"""
+    xor = hashes[start:stop, None] ^ hashes[None, :]
+    return np.unpackbits(xor.view(np.uint8).reshape(xor.shape + (8,)), axis=-1).sum(axis=-1)
+
+
+class Manifest:
+    """train/ 的增量清單，存於 train/.manifest.json"""
+
+    def __init__(self, train_dir=TRAIN_DIR):
+        self.train_dir = Path(train_dir)
+        self.path = self.train_dir / MANIFEST_NAME
+        self.entries = {}
+        # deduplicated() 的結果 (依 max_distance)，entries 改變時清空
+        self._deduplicated = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = {e["path"]: e for e in json.load(f)["files"]}
+
+    def update(self):
+        """
+        掃描 train/<類別>/，只為新增或改變 (大小/修改時間不同) 的檔案計算雜湊。
+        回傳 (新增或更新數, 刪除數)。
+        """
+        seen = set()
+        changed = 0
+
+        for cat_dir in sorted(p for p in self.train_dir.iterdir() if p.is_dir()):
+            for file in sorted(cat_dir.iterdir()):
+                if file.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                rel = file.relative_to(self.train_dir).as_posix()
+                seen.add(rel)
+                stat = file.stat()
+                entry = self.entries.get(rel)
+                if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                    continue
+
+                entry = {"path": rel, "size": stat.st_size, "mtime": stat.st_mtime,
+                         "sha256": sha256sum(file), "label": cat_dir.name}
+                try:
+                    with Image.open(file) as img:
+                        entry["width"], entry["height"] = img.size
+                        entry["phash"] = phash(img)
+                except Exception as e:
+                    # 無法解碼的檔案仍記錄，但不參與近似比對
+                    entry["width"] = entry["height"] = entry["phash"] = None
+                    entry["error"] = str(e)
+                self.entries[rel] = entry
+                changed += 1
+
+        removed = [rel for rel in self.entries if rel not in seen]
+        for rel in removed:
+            del self.entries[rel]
+        if changed or removed:
+            self._deduplicated.clear()
+
+        if changed or removed or not self.path.exists():
+            self.save()
+        return changed, len(removed)
+
+    def save(self):
+        """寫入 manifest (先寫暫存檔再取代，避免中斷時留下壞檔)"""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "files": sorted(self.entries.values(), key=lambda e: e["path"])},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def near_duplicates(self, max_distance=MAX_DISTANCE):
+        """
+        找出重複圖片群組: SHA-256 相同，或 pHash 漢明距離 <= max_distance。
+        回傳 list of list[entry]，每組至少兩張，依路徑排序。
+        """
+        entries = sorted(self.entries.values(), key=lambda e: e["path"])
+        parent = list(range(len(entries)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i, j):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+        # 完全相同的內容
+        by_sha = {}
+        for i, e in enumerate(entries):
+            if e["sha256"] in by_sha:
+                union(by_sha[e["sha256"]], i)
+            else:
+                by_sha[e["sha256"]] = i
+
+        # pHash 近似 (分塊計算，避免 N x N 一次佔滿記憶體)
+        indexed = [i for i, e in enumerate(entries) if e.get("phash")]
+        if indexed:
+            hashes = np.array([int(entries[i]["phash"], 16) for i in indexed], dtype=np.uint64)
+            for start in range(0, len(hashes), 512):
+                stop = min(start + 512, len(hashes))
+                distances = _hamming_matrix(hashes, start, stop)
+                for a, b in zip(*np.nonzero(distances <= max_distance)):
+                    a += start
+                    if a < b:
+                        union(indexed[a], indexed[b])
+
+        groups = {}
+        for i, e in enumerate(entries):
+            groups.setdefault(find(i), []).append(e)
+        return [g for g in groups.values() if len(g) > 1]
+
+    def deduplicated(self, max_distance=MAX_DISTANCE):
+        """
+        每個重複群組只保留第一張 (依路徑排序) 的清單。
+        兩兩比對 pHash 是 O(N²)，結果快取到 update() 改變 entries 為止
+        (files() 每個類別呼叫一次，不再每次重算)。
+        """
+        if max_distance not in self._deduplicated:
+            drop = set()
+            for group in self.near_duplicates(max_distance):
+                drop.update(e["path"] for e in group[1:])
+            self._deduplicated[max_distance] = [e for path, e in sorted(self.entries.items())
+                                                if path not in drop and e.get("phash") is not None]
+        return self._deduplicated[max_distance]
+
+    def files(self, label, deduplicate=True, max_distance=MAX_DISTANCE):
+        """某類別的圖片路徑 (依路徑排序)"""
+        entries = self.deduplicated(max_distance) if deduplicate else sorted(
+            self.entries.values(), key=lambda e: e["path"])
+        return [self.train_dir / e["path"] for e in entries if e["label"] == label]
+
+
+def print_report(manifest, max_distance=MAX_DISTANCE):
+    """列出重複圖片群組"""
+    groups = manifest.near_duplicates(max_distance)
+    extra = sum(len(g) - 1 for g in groups)
+    print(f"\n🔍 重複圖片: {len(groups)} 組，可移除 {extra} 張 (pHash 距離 <= {max_distance})")
+    for n, group in enumerate(groups, 1):
+        labels = {e["label"] for e in group}
+        mark = " ⚠️ 類別不一致" if len(labels) > 1 else ""
+        print(f"  群組 {n}:{mark}")
+        for e in group:
+            print(f"      {e['path']}  ({e['width']}x{e['height']}, {e['size'] / 1024:.0f} KB)")
+
+    broken = [e for e in manifest.entries.values() if e.get("error")]
+    if broken:
+        print(f"\n❌ 無法解碼: {len(broken)} 張")
+        for e in broken:
+            print(f"  - {e['path']}: {e['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="更新 train/ 資料集清單並找出重複圖片")
+    parser.add_argument("--train-dir", default=str(TRAIN_DIR))
+    parser.add_argument("--max-distance", type=int, default=MAX_DISTANCE,
+                        help="pHash 漢明距離門檻 (0-64)")
+    args = parser.parse_args()
+
+    manifest = Manifest(args.train_dir)
+    changed, removed = manifest.update()
+    print(f"📋 清單: {len(manifest.entries)} 張 (更新 {changed}、移除 {removed})")
+    print_report(manifest, args.max_distance)
+
+
+if __name__ == "__main__":
+    main()
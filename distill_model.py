@@ -0,0 +1,309 @@
+"""
+SmartRecycle AI - 知識蒸餾 (Knowledge Distillation) 訓練腳本
+以已匯出的完整模型 (docs/model 或 result/3、result/4) 作為教師，
+訓練一個小型學生模型，給瀏覽器 (docs/js/app.js) 與 Raspberry Pi 等級的裝置使用。
+
+- 教師: tfjs_model.load_layers_model 從 TF.js 匯出檔載入，類別與 labels.json 相同
+- 軟標籤: 每個訓練批次先做資料增強，再由教師即時產生 (同一張增強影像，教師與學生看到的一樣)
+- 損失: alpha * T² * KL(教師 ‖ 學生，溫度 T) + (1 - alpha) * 交叉熵(真實標籤)
+  兩個模型輸出都是 softmax 機率，以 log 機率當作 logits 再除以溫度
+- 學生: 小 alpha 的 MobileNet (train_model.BACKBONES) 或窄 CNN (narrow_cnn)
+- 匯出: 與 train_model.py 相同的 TF.js 路徑，再經 fix_model.py 修正拓撲並量化權重
+
+使用方式:
+    python distill_model.py
+    python distill_model.py --teacher result/4 --student narrow_cnn --input-size 128
+    python distill_model.py --student mobilenet_v2_0.35 --input-size 160 --fine-tune
+
+依賴套件:
+    pip install tensorflow tensorflowjs Pillow
+"""
+
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+import tensorflow as tf
+from tensorflow.keras import layers
+from tensorflow.keras.models import Model
+
+import fix_model
+import tfjs_model
+from data_pipeline import list_images, make_dataset, make_augment, ThroughputLogger
+from train_model import (TRAIN_DIR, MODEL_DIR, IMAGE_SIZE, BATCH_SIZE, AUGMENTATION, VALIDATION_SPLIT,
+                         DEDUPLICATE, BACKBONES, INPUT_SIZES, build_model, export_to_tfjs,
+                         measure_latency, artifact_size, export_candidate)
+
+# ===== 設定 =====
+TEACHER_DIR = MODEL_DIR
+STUDENT_DIR = MODEL_DIR / "student"
+STUDENT = "narrow_cnn"
+STUDENT_INPUT_SIZE = 128
+# 窄 CNN 第一層的通道數 (之後每個區塊加倍)
+NARROW_CNN_WIDTH = 16
+
+EPOCHS = 30
+LEARNING_RATE = 0.001
+# 蒸餾溫度與軟標籤損失的權重
+TEMPERATURE = 4.0
+ALPHA = 0.7
+# 驗證準確率連續幾個 epoch 沒進步就停止
+PATIENCE = 5
+
+# 學生權重的量化方式 (fix_model.py optimize)
+QUANTIZE = "float16"
+
+
+def build_narrow_cnn(num_classes, input_size=STUDENT_INPUT_SIZE, width=NARROW_CNN_WIDTH):
+    """
+    窄 CNN 學生: 一層一般卷積 + 四個深度可分離卷積區塊 (每塊步幅 2、通道加倍)。
+    與 train_model.build_model 相同，模型輸入固定為 IMAGE_SIZE，在模型內縮放到 input_size。
+    只用 TF.js layers 支援的層 (Conv2D、DepthwiseConv2D、BatchNormalization、ReLU)。
+    """
+    print(f"\n🏗️ 建立窄 CNN 學生 ({input_size}x{input_size}, 寬度 {width})...")
+    inputs = layers.Input(shape=(*IMAGE_SIZE, 3))
+    x = inputs
+    if input_size != IMAGE_SIZE[0]:
+        x = layers.Resizing(input_size, input_size)(x)
+
+    x = layers.Conv2D(width, 3, strides=2, padding='same', use_bias=False)(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.ReLU(6.0)(x)
+    for i in range(4):
+        x = layers.DepthwiseConv2D(3, strides=2, padding='same', use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU(6.0)(x)
+        x = layers.Conv2D(width * 2 ** (i + 1), 1, use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU(6.0)(x)
+
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+    outputs = layers.Dense(num_classes, activation='softmax')(x)
+    model = Model(inputs=inputs, outputs=outputs)
+    print(f"  總參數: {model.count_params():,}")
+    return model
+
+
+def build_student(num_classes, student=STUDENT, input_size=STUDENT_INPUT_SIZE, fine_tune=False):
+    """student: "narrow_cnn" 或 train_model.BACKBONES 中的骨幹 (fine_tune=True 時骨幹一起訓練)"""
+    if student == "narrow_cnn":
+        return build_narrow_cnn(num_classes, input_size)
+    model = build_model(num_classes, student, input_size)
+    if fine_tune:
+        for layer in model.layers:
+            # BatchNorm 保持推論模式，小資料集上統計值才不會被打亂
+            layer.trainable = not isinstance(layer, layers.BatchNormalization)
+    return model
+
+
+def load_teacher(teacher_dir):
+    """
+    載入教師模型，回傳 (模型, 類別, 前處理函式)。
+    前處理把訓練管線的 [0, 1] 影像轉成教師的輸入範圍與尺寸 (tfjs_model.input_scaling)。
+    """
+    print(f"\n👩‍🏫 載入教師模型: {teacher_dir}")
+    teacher = tfjs_model.load_layers_model(teacher_dir)
+    teacher.trainable = False
+    labels = tfjs_model.load_labels(teacher_dir)
+    scale, offset = tfjs_model.input_scaling(teacher_dir)
+    height, width = teacher.input_shape[1:3]
+
+    def preprocess(images):
+        if (height, width) != IMAGE_SIZE:
+            images = tf.image.resize(images, (height, width))
+        return images * (255.0 * scale) + offset
+
+    print(f"  類別: {labels}，參數: {teacher.count_params():,}")
+    return teacher, labels, preprocess
+
+
+def distillation_loss(y_true, teacher_probs, student_probs, temperature=TEMPERATURE, alpha=ALPHA):
+    """alpha * T² * KL(教師軟標籤 ‖ 學生軟預測) + (1 - alpha) * 交叉熵(真實標籤)"""
+    eps = 1e-7
+    teacher_soft = tf.nn.softmax(tf.math.log(teacher_probs + eps) / temperature)
+    student_log_soft = tf.nn.log_softmax(tf.math.log(student_probs + eps) / temperature)
+    kl = tf.reduce_sum(teacher_soft * (tf.math.log(teacher_soft + eps) - student_log_soft), axis=-1)
+    ce = tf.keras.losses.categorical_crossentropy(y_true, student_probs)
+    return tf.reduce_mean(alpha * temperature ** 2 * kl + (1 - alpha) * ce)
+
+
+def evaluate(model, val_ds, preprocess=None):
+    """驗證集準確率與所有預測類別"""
+    preds, labels = [], []
+    for x, y in val_ds:
+        if preprocess:
+            x = preprocess(x)
+        preds.append(np.argmax(model(x, training=False).numpy(), axis=1))
+        labels.append(np.argmax(y.numpy(), axis=1))
+    preds, labels = np.concatenate(preds), np.concatenate(labels)
+    return float(np.mean(preds == labels)), preds
+
+
+def distill(student, teacher, preprocess, train_ds, val_ds, train_samples,
+            epochs=EPOCHS, temperature=TEMPERATURE, alpha=ALPHA):
+    """
+    蒸餾訓練迴圈: 軟標籤在每個 (已增強的) 批次上由教師即時產生。
+    驗證準確率最佳的權重會在結束時還原 (同 EarlyStopping(restore_best_weights=True))。
+    """
+    print(f"\n🚀 開始蒸餾 (T={temperature}, alpha={alpha})...")
+    optimizer = tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE)
+
+    @tf.function
+    def train_step(x, y):
+        teacher_probs = teacher(preprocess(x), training=False)
+        with tf.GradientTape() as tape:
+            student_probs = student(x, training=True)
+            loss = distillation_loss(y, teacher_probs, student_probs, temperature, alpha)
+        grads = tape.gradient(loss, student.trainable_variables)
+        optimizer.apply_gradients(zip(grads, student.trainable_variables))
+        return loss
+
+    throughput = ThroughputLogger(train_samples)
+    best_acc, best_weights, stale = -1.0, None, 0
+    for epoch in range(epochs):
+        throughput.on_epoch_begin(epoch)
+        losses = [float(train_step(x, y)) for x, y in train_ds]
+        throughput.on_test_begin()
+        val_acc, _ = evaluate(student, val_ds)
+        print(f"  Epoch {epoch + 1}/{epochs}: loss {np.mean(losses):.4f}, 驗證準確率 {val_acc:.2%}")
+        throughput.on_epoch_end(epoch)
+
+        if val_acc > best_acc:
+            best_acc, best_weights, stale = val_acc, student.get_weights(), 0
+        else:
+            stale += 1
+            if stale >= PATIENCE:
+                print(f"  驗證準確率 {PATIENCE} 個 epoch 沒有進步，提前停止")
+                break
+
+    if best_weights is not None:
+        student.set_weights(best_weights)
+    return best_acc
+
+
+def export_student(student, labels, out_dir, quantize=QUANTIZE):
+    """
+    與主模型相同的匯出路徑: TF.js layers-model -> fix_model.py 拓撲修正 (Keras 3)
+    -> fix_model.py optimize 量化並重新分片到 <out_dir>/optimized。
+    """
+    export_to_tfjs(student, out_dir, labels)
+    model_json = out_dir / "model.json"
+    if not model_json.exists():
+        print("  ⚠️ 沒有 model.json，略過 fix_model.py")
+        return None
+
+    if tfjs_model.keras_major_version() >= 3:
+        fix_model.convert_model(model_json, model_json)
+
+    optimized_dir = out_dir / "optimized"
+    report = fix_model.optimize_artifacts(out_dir, optimized_dir, quantize)
+    images = fix_model.sample_images(TRAIN_DIR)
+    if images:
+        report.update(fix_model.output_report(out_dir, optimized_dir, images))
+    with open(optimized_dir / "optimize_report.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartRecycle AI - 知識蒸餾")
+    parser.add_argument("--teacher", type=Path, default=TEACHER_DIR,
+                        help="教師模型的 TF.js layers-model 目錄 (例如 docs/model、result/4)")
+    parser.add_argument("--student", choices=["narrow_cnn", *BACKBONES], default=STUDENT,
+                        help="學生模型: 窄 CNN 或 train_model.py 的骨幹")
+    parser.add_argument("--input-size", type=int, choices=INPUT_SIZES, default=STUDENT_INPUT_SIZE,
+                        help="學生的輸入邊長 (模型仍接收 224x224，在模型內縮放)")
+    parser.add_argument("--fine-tune", action="store_true",
+                        help="MobileNet 學生: 骨幹一起訓練 (預設凍結，只訓練頂層)")
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=ALPHA,
+                        help="軟標籤損失的權重 (1 - alpha 給真實標籤)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--out", type=Path, default=STUDENT_DIR, help="學生模型的匯出目錄")
+    parser.add_argument("--quantize", choices=["float16", "uint8", "none"], default=QUANTIZE,
+                        help="fix_model.py optimize 的權重量化方式")
+    parser.add_argument("--cache", choices=["memory", "disk", "none"], default="memory",
+                        help="快取解碼後的影像 (記憶體 / 磁碟 .tfdata_cache / 不快取)")
+    args = parser.parse_args()
+    if args.epochs < 1:
+        parser.error("--epochs 至少要 1")
+
+    print("="*60)
+    print("🗑️ SmartRecycle AI - 知識蒸餾")
+    print("="*60)
+
+    # 1. 教師 (類別順序以教師為準)
+    teacher, labels, preprocess = load_teacher(args.teacher)
+
+    # 2. 資料: 與 train_model.py 相同的切分、資料增強與前處理
+    print("\n📊 準備訓練資料...")
+    train_items, val_items = list_images(TRAIN_DIR, labels, VALIDATION_SPLIT, DEDUPLICATE)
+    cache = None if args.cache == "none" else args.cache
+    train_ds = make_dataset(train_items, len(labels), IMAGE_SIZE, BATCH_SIZE, training=True,
+                            cache=cache, cache_name="distill_train", augment=make_augment(**AUGMENTATION))
+    val_ds = make_dataset(val_items, len(labels), IMAGE_SIZE, BATCH_SIZE, training=False,
+                          cache=cache, cache_name="distill_val")
+    print(f"  訓練樣本: {len(train_items)}, 驗證樣本: {len(val_items)}")
+
+    # 3. 學生與蒸餾
+    student = build_student(len(labels), args.student, args.input_size, args.fine_tune)
+    distill(student, teacher, preprocess, train_ds, val_ds, len(train_items),
+            args.epochs, args.temperature, args.alpha)
+
+    # 4. 匯出
+    optimize_report = export_student(student, labels, args.out, None if args.quantize == "none" else args.quantize)
+
+    # 5. 與教師比較: 準確率、一致率、CPU 延遲、實際匯出檔大小
+    print("\n📈 教師 vs 學生 (驗證集):")
+    teacher_acc, teacher_pred = evaluate(teacher, val_ds, preprocess)
+    student_acc, student_pred = evaluate(student, val_ds)
+    student_size = artifact_size(args.out)
+    if student_size is None:
+        student_size, _ = export_candidate(student, args.out)
+    report = {
+        "teacher": {
+            "dir": str(args.teacher),
+            "accuracy": teacher_acc,
+            "latency_ms": measure_latency(teacher),
+            "size_bytes": artifact_size(args.teacher),
+        },
+        "student": {
+            "model": args.student,
+            "input_size": args.input_size,
+            "accuracy": student_acc,
+            "agreement_with_teacher": float(np.mean(student_pred == teacher_pred)),
+            "latency_ms": measure_latency(student),
+            "size_bytes": student_size,
+        },
+        "temperature": args.temperature,
+        "alpha": args.alpha,
+    }
+    if optimize_report:
+        report["student"]["optimized_bytes"] = optimize_report["optimized_bytes"]
+    t, s = report["teacher"], report["student"]
+    print(f"  教師: 準確率 {t['accuracy']:.2%}, 延遲 {t['latency_ms']:.1f} ms, 大小 {t['size_bytes'] / 1e6:.1f} MB")
+    print(f"  學生: 準確率 {s['accuracy']:.2%} (差異 {s['accuracy'] - t['accuracy']:+.2%}, "
+          f"與教師一致 {s['agreement_with_teacher']:.1%}), 延遲 {s['latency_ms']:.1f} ms, "
+          f"大小 {s['size_bytes'] / 1e6:.2f} MB")
+    print(f"  加速 {t['latency_ms'] / s['latency_ms']:.1f}x，縮小 {t['size_bytes'] / s['size_bytes']:.1f}x")
+
+    report_path = args.out / "distill_report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n" + "="*60)
+    print("✅ 蒸餾完成！")
+    print("="*60)
+    print(f"\n學生模型已匯出至: {args.out} (量化版本: {args.out / 'optimized'})")
+    print(f"報告: {report_path}")
+    print("\n下一步:")
+    print("1. 瀏覽器: 將 docs/js/config.js 的 MODEL.URL 指向 ./model/student/optimized/，"
+          "並設定 USE_GRAPH_MODEL = false")
+    print(f"2. 邊緣裝置: python main.py --model {args.out / 'optimized'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -171,9 +171,20 @@ async function loadModel() {
             console.log('[DEBUG] 類別數量:', AppState.maxPredictions);
         } else if (CONFIG.MODEL.IS_CUSTOM_MODEL) {
             console.log('[DEBUG] 嘗試載入自訓練模型...');
-            // 使用標準 TensorFlow.js 載入 Colab 訓練的模型
-            AppState.model = await tf.loadLayersModel(CONFIG.MODEL.URL);
-            console.log('[DEBUG] ✅ Colab 訓練模型載入成功');
+            // 優先載入 graph-model (train_model.py 匯出)，失敗時退回 layers-model
+            if (CONFIG.MODEL.USE_GRAPH_MODEL) {
+                try {
+                    AppState.model = await tf.loadGraphModel(CONFIG.MODEL.GRAPH_MODEL_URL);
+                    console.log('[DEBUG] ✅ graph-model 載入成功');
+                } catch (e) {
+                    console.warn('[DEBUG] graph-model 載入失敗，改用 layers-model:', e.message);
+                }
+            }
+            if (!AppState.model) {
+                // 使用標準 TensorFlow.js 載入 Colab 訓練的模型
+                AppState.model = await tf.loadLayersModel(CONFIG.MODEL.URL);
+                console.log('[DEBUG] ✅ Colab 訓練模型載入成功');
+            }
             console.log('[DEBUG] 模型輸入形狀:', AppState.model.inputs[0].shape);
             console.log('[DEBUG] 模型輸出形狀:', AppState.model.outputs[0].shape);
         } else {
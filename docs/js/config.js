@@ -15,7 +15,11 @@ const CONFIG = {
         // 是否使用 Teachable Machine 模型
         IS_TEACHABLE_MACHINE: true,
         // 是否已載入自訓練模型
-        IS_CUSTOM_MODEL: true
+        IS_CUSTOM_MODEL: true,
+        // 自訓練模型優先載入 graph-model (BatchNorm 已折疊、op 已融合，載入與推論較快)
+        // 找不到時退回 layers-model (URL)
+        USE_GRAPH_MODEL: true,
+        GRAPH_MODEL_URL: './model/graph/model.json'
     },
 
     // ===== 辨識設定 =====
@@ -0,0 +1,217 @@
+"""
+Offline video evaluation
+Runs a model over recorded station footage without a GUI and writes a
+per-timestamp label timeline plus summary statistics.
+
+- Decoding runs in a separate process. Frames are sampled at a fixed stride
+  or time interval: long gaps are skipped by seeking, short gaps by grab()
+  (which skips the colour conversion), so not every frame is fully decoded
+- Sampled frames are resized to 224x224 RGB in the decoder process and sent
+  in batches; each batch is one forward pass
+- Decode and inference throughput are measured separately, together with
+  the real-time factor (video duration / wall time)
+
+Usage:
+    python evaluate_video.py station1.mp4 --model docs/model --interval 0.5
+    python evaluate_video.py station1.mp4 --model docs/model --stride 10 --out timeline.csv
+"""
+
+import csv
+import json
+import time
+import queue
+import argparse
+import multiprocessing as mp
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from classifier import Classifier, INPUT_SIZE
+
+# Gaps of more than this many frames are skipped by seeking instead of grab()
+SEEK_THRESHOLD = 30
+# How often the evaluator checks that the decoder process is still alive
+DECODER_POLL_S = 1.0
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return fps, frames
+
+
+def decode_worker(path, stride, batch_size, out_q):
+    """
+    Decoder process: reads every `stride`-th frame, resizes it to INPUT_SIZE RGB
+    and sends (frame indices, images) batches, then ("done", sampled, decode seconds).
+    """
+    cap = cv2.VideoCapture(str(path))
+    decode_time = 0.0  # excludes time blocked on a full queue
+    position = 0  # index of the next frame read() would return
+    target = 0
+    indices, images = [], []
+    sampled = 0
+
+    while True:
+        start = time.perf_counter()
+        gap = target - position
+        if gap > SEEK_THRESHOLD:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        else:
+            for _ in range(gap):
+                cap.grab()
+        position = target
+
+        ret, frame = cap.read()
+        if not ret:
+            break
+        position += 1
+
+        indices.append(target)
+        images.append(cv2.cvtColor(cv2.resize(frame, INPUT_SIZE), cv2.COLOR_BGR2RGB))
+        sampled += 1
+        decode_time += time.perf_counter() - start
+        if len(images) == batch_size:
+            out_q.put((indices, np.stack(images)))
+            indices, images = [], []
+        target += stride
+
+    if images:
+        out_q.put((indices, np.stack(images)))
+    out_q.put(("done", sampled, decode_time))
+    cap.release()
+
+
+def next_batch(out_q, decoder, poll=DECODER_POLL_S):
+    """
+    Next message from the decoder. Raises RuntimeError if the decoder process
+    died (codec error, out of memory, ...) instead of waiting forever.
+    """
+    while True:
+        try:
+            return out_q.get(timeout=poll)
+        except queue.Empty:
+            if not decoder.is_alive():
+                raise RuntimeError(f"Decoder process exited with code {decoder.exitcode} before finishing")
+
+
+def segments(timeline):
+    """Collapses the timeline into runs of the same label: [{label, start_s, end_s}]"""
+    runs = []
+    for record in timeline:
+        if runs and runs[-1]["label"] == record["label"]:
+            runs[-1]["end_s"] = record["timestamp_s"]
+        else:
+            runs.append({"label": record["label"], "start_s": record["timestamp_s"], "end_s": record["timestamp_s"]})
+    return runs
+
+
+def write_timeline(timeline, path):
+    path = Path(path)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            writer = csv.DictWriter(f, fieldnames=["timestamp_s", "frame", "label", "score", "is_recyclable"])
+            writer.writeheader()
+            writer.writerows(timeline)
+        else:
+            for record in timeline:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a recorded video offline (no GUI)")
+    parser.add_argument("video")
+    parser.add_argument("--model", metavar="DIR",
+                        help="Use our trained TF.js model (e.g. docs/model) instead of ImageNet MobileNetV2")
+    parser.add_argument("--engine", choices=["keras", "tflite"], default="keras")
+    parser.add_argument("--tflite", metavar="FILE",
+                        help="TFLite model for --engine tflite (default: <model>/model_int8.tflite)")
+    parser.add_argument("--threads", type=int, help="CPU threads for the tflite engine")
+    sampling = parser.add_mutually_exclusive_group()
+    sampling.add_argument("--interval", type=float, default=1.0, help="Seconds between sampled frames")
+    sampling.add_argument("--stride", type=int, help="Frames between sampled frames (overrides --interval)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--out", help="Timeline file (.csv or .jsonl, default: <video>.timeline.csv)")
+    parser.add_argument("--summary", help="Summary JSON (default: <video>.summary.json)")
+    args = parser.parse_args()
+
+    video = Path(args.video)
+    fps, frame_count = video_info(video)
+    stride = args.stride or max(1, round(args.interval * fps))
+    duration = frame_count / fps if fps else 0.0
+    print(f"{video.name}: {frame_count} frames at {fps:.1f} fps ({duration:.1f}s), "
+          f"sampling every {stride} frames ({stride / fps:.2f}s)")
+
+    classifier = Classifier(model_dir=args.model, engine=args.engine,
+                            tflite_path=args.tflite, num_threads=args.threads)
+    classifier.warmup()
+
+    # Bounded queue: the decoder stays at most a few batches ahead of inference
+    out_q = mp.Queue(maxsize=4)
+    decoder = mp.Process(target=decode_worker, args=(str(video), stride, args.batch_size, out_q), daemon=True)
+    start = time.perf_counter()
+    decoder.start()
+
+    timeline = []
+    inference_time = 0.0
+    while True:
+        item = next_batch(out_q, decoder)
+        if item[0] == "done":
+            _, sampled, decode_time = item
+            break
+        indices, images = item
+        t = time.perf_counter()
+        results = classifier.predict_rgb_batch(images)
+        inference_time += time.perf_counter() - t
+        for index, result in zip(indices, results):
+            timeline.append({
+                "timestamp_s": round(index / fps, 3),
+                "frame": index,
+                "label": result["label"],
+                "score": round(result["score"], 4),
+                "is_recyclable": result["is_recyclable"],
+            })
+        print(f"  {timeline[-1]['timestamp_s']:.1f}s / {duration:.1f}s", end="\r")
+    decoder.join()
+    wall_time = time.perf_counter() - start
+
+    out_path = args.out or video.with_suffix(".timeline.csv")
+    write_timeline(timeline, out_path)
+
+    counts = Counter(record["label"] for record in timeline)
+    summary = {
+        "video": str(video),
+        "model_version": classifier.version,
+        "fps": fps,
+        "duration_s": duration,
+        "stride_frames": stride,
+        "samples": len(timeline),
+        "label_counts": dict(counts.most_common()),
+        "label_fractions": {label: n / len(timeline) for label, n in counts.most_common()} if timeline else {},
+        "recyclable_fraction": (sum(r["is_recyclable"] for r in timeline) / len(timeline)) if timeline else 0.0,
+        "mean_score": float(np.mean([r["score"] for r in timeline])) if timeline else 0.0,
+        "segments": segments(timeline),
+        "decode_fps": sampled / decode_time if decode_time else 0.0,
+        "inference_fps": len(timeline) / inference_time if inference_time else 0.0,
+        "wall_time_s": wall_time,
+        "realtime_factor": duration / wall_time if wall_time else 0.0,
+    }
+    summary_path = args.summary or video.with_suffix(".summary.json")
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    print(f"\nSampled {len(timeline)} frames in {wall_time:.1f}s ({summary['realtime_factor']:.1f}x real time)")
+    print(f"  decode: {summary['decode_fps']:.1f} frames/s, inference: {summary['inference_fps']:.1f} frames/s")
+    for label, n in counts.most_common():
+        print(f"  {label}: {n} ({n / len(timeline):.0%})")
+    print(f"Timeline: {out_path}\nSummary: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+SmartRecycle AI - 凍結骨幹特徵快取
+MobileNetV2 骨幹在訓練時是凍結的，所以每張圖片的 GlobalAveragePooling2D 特徵
+只需要計算一次；之後只訓練 Dense/Dropout 頂層即可。
+
+快取結構:
+    .feature_cache/<骨幹版本>/<圖片內容 sha256>.npy
+    每個檔案形狀為 (1 + K, 特徵維度)
+    - 第 0 列: 原圖特徵
+    - 第 1..K 列: K 個資料增強版本的特徵
+
+以內容雜湊為 key，改檔名、換類別都不需重算；只有新增或內容改變的圖片才會跑骨幹。
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = Path(__file__).parent / ".feature_cache"
+
+
+def file_hash(path):
+    """圖片內容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    以 (圖片內容雜湊, 骨幹版本) 為 key 的特徵快取。
+
+    extractor: 輸入 (N, H, W, 3) float32 影像，輸出 (N, D) 特徵的可呼叫物件
+    load_image: path -> (H, W, 3) float32 影像 (已做與訓練相同的前處理)
+    augment: (H, W, 3) 影像 -> 隨機增強後的影像；None 表示不產生增強版本
+    """
+
+    def __init__(self, backbone_version, extractor, load_image, augment=None,
+                 cache_dir=CACHE_DIR, batch_size=32):
+        self.dir = Path(cache_dir) / backbone_version
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.extractor = extractor
+        self.load_image = load_image
+        self.augment = augment
+        self.batch_size = batch_size
+        self.computed = 0
+
+    def _path(self, digest):
+        return self.dir / f"{digest}.npy"
+
+    def _extract(self, images):
+        """分批跑骨幹"""
+        features = []
+        for i in range(0, len(images), self.batch_size):
+            batch = np.stack(images[i:i + self.batch_size]).astype(np.float32)
+            features.append(np.asarray(self.extractor(batch)))
+        self.computed += len(images)
+        return np.concatenate(features)
+
+    def features(self, paths, variants=0):
+        """
+        回傳 (N, 1 + variants, D) 特徵陣列 (快取以 float16 儲存)。
+        已快取的圖片直接讀檔；缺少的 (或增強版本不足的) 才計算並寫回快取。
+        """
+        if self.augment is None:
+            variants = 0
+        results = [None] * len(paths)
+        pending = []  # (index, digest, cached, 需要補算的版本數)
+
+        for i, path in enumerate(paths):
+            digest = file_hash(path)
+            cache_path = self._path(digest)
+            cached = np.load(cache_path) if cache_path.exists() else None
+            have = 0 if cached is None else cached.shape[0]
+            if have >= 1 + variants:
+                results[i] = cached[:1 + variants]
+            else:
+                pending.append((i, digest, cached, 1 + variants - have))
+
+        if pending:
+            print(f"  🧠 計算骨幹特徵: {len(pending)} 張圖片 (其餘 {len(paths) - len(pending)} 張使用快取)")
+
+        # 每次處理一批圖片，避免一次把所有影像載入記憶體
+        chunk = max(1, self.batch_size // (1 + variants))
+        for start in range(0, len(pending), chunk):
+            items = pending[start:start + chunk]
+            images = []
+            for i, digest, cached, missing in items:
+                img = self.load_image(paths[i])
+                if cached is None:
+                    images.append(img)
+                    missing -= 1
+                for _ in range(missing):
+                    images.append(self.augment(img))
+
+            features = self._extract(images)
+            offset = 0
+            for i, digest, cached, missing in items:
+                new = features[offset:offset + missing]
+                offset += missing
+                merged = new if cached is None else np.concatenate([cached, new])
+                np.save(self._path(digest), merged.astype(np.float16))
+                results[i] = merged[:1 + variants]
+
+        return np.stack([r.astype(np.float32) for r in results])
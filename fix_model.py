@@ -7,11 +7,21 @@ Changes:
 2. DTypePolicy object -> simple string
 3. inbound_nodes format conversion
 4. Initializer format simplification
+
+Artifact optimization (python fix_model.py optimize <model_dir> <out_dir>):
+5. Weight quantization (float16 or uint8 with per-tensor scale/min in weightsManifest)
+6. Re-packing of weight shards to a target size
+7. Manifest verification and an output-difference report on sample images
 """
 
 import json
 import sys
 import copy
+import shutil
+import argparse
+from pathlib import Path
+
+import numpy as np
 
 def fix_dtype(config):
     """Convert DTypePolicy object to simple string"""
@@ -128,7 +138,182 @@ def convert_model(input_path, output_path):
     print("✅ Conversion complete!")
     return True
 
+def quantize_weight(value, dtype):
+    """
+    Quantizes one float32 weight.
+    Returns (raw bytes array, quantization entry for weightsManifest or None).
+    """
+    if value.dtype != np.float32 or dtype is None:
+        return value, None
+
+    if dtype == 'float16':
+        return value.astype(np.float16), {'dtype': 'float16'}
+
+    # uint8 affine: value ~= q * scale + min
+    min_val = float(value.min()) if value.size else 0.0
+    max_val = float(value.max()) if value.size else 0.0
+    scale = (max_val - min_val) / 255.0 if max_val > min_val else 1.0
+    q = np.clip(np.round((value - min_val) / scale), 0, 255).astype(np.uint8)
+    return q, {'dtype': 'uint8', 'scale': scale, 'min': min_val}
+
+def write_shards(data, out_dir, shard_size):
+    """Splits the concatenated weight bytes into group1-shard{i}of{n}.bin files"""
+    n = max(1, -(-len(data) // shard_size))
+    paths = []
+    for i in range(n):
+        name = f'group1-shard{i + 1}of{n}.bin'
+        (out_dir / name).write_bytes(data[i * shard_size:(i + 1) * shard_size])
+        paths.append(name)
+    return paths
+
+def verify_manifest(model_dir):
+    """
+    Checks that every manifest entry has a known dtype and that the entries
+    exactly cover the bytes of the referenced shards. Returns total weight bytes.
+    """
+    import tfjs_model
+
+    model_dir = Path(model_dir)
+    with open(model_dir / 'model.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)['weightsManifest']
+
+    total = 0
+    for group in manifest:
+        shard_bytes = sum((model_dir / p).stat().st_size for p in group['paths'])
+        expected = 0
+        for spec in group['weights']:
+            quant = spec.get('quantization')
+            dtype = quant['dtype'] if quant else spec['dtype']
+            if dtype not in tfjs_model.DTYPES:
+                raise ValueError(f"{spec['name']}: unknown dtype {dtype}")
+            if quant and quant['dtype'] == 'uint8' and not {'scale', 'min'} <= quant.keys():
+                raise ValueError(f"{spec['name']}: uint8 quantization without scale/min")
+            expected += tfjs_model.spec_nbytes(spec)
+        if expected != shard_bytes:
+            raise ValueError(f"Manifest describes {expected} bytes but shards {group['paths']} hold {shard_bytes}")
+        total += shard_bytes
+    return total
+
+def optimize_artifacts(model_dir, out_dir, quantize='float16', shard_size=4 * 1024 * 1024):
+    """
+    Quantizes and re-packs the weights of a TF.js layers-model.
+    Topology is copied unchanged; other files (metadata.json, labels.json) are copied along.
+    """
+    import tfjs_model
+
+    model_dir, out_dir = Path(model_dir), Path(out_dir)
+    if model_dir.resolve() == out_dir.resolve():
+        raise ValueError("out_dir must differ from model_dir (the original weights are needed for the report)")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(model_dir / 'model.json', 'r', encoding='utf-8') as f:
+        model = json.load(f)
+    original = sum((model_dir / p).stat().st_size
+                   for group in model['weightsManifest'] for p in group['paths'])
+
+    weights = tfjs_model.read_weights(model_dir, model['weightsManifest'])
+    print(f"Quantizing {len(weights)} weights to {quantize or 'float32'}...")
+
+    chunks = []
+    specs = []
+    max_error = 0.0
+    for group in model['weightsManifest']:
+        for spec in group['weights']:
+            value = np.asarray(weights[spec['name']])
+            raw, quant = quantize_weight(value, quantize)
+            new_spec = {'name': spec['name'], 'shape': spec['shape'], 'dtype': spec['dtype']}
+            if quant:
+                new_spec['quantization'] = quant
+                restored = tfjs_model.dequantize(np.frombuffer(raw.tobytes(), dtype=np.uint8), new_spec)
+                if value.size:
+                    max_error = max(max_error, float(np.abs(restored - value).max()))
+            specs.append(new_spec)
+            chunks.append(raw.tobytes())
+
+    for old in out_dir.glob('*.bin'):
+        old.unlink()
+    paths = write_shards(b''.join(chunks), out_dir, shard_size)
+    model['weightsManifest'] = [{'paths': paths, 'weights': specs}]
+
+    with open(out_dir / 'model.json', 'w', encoding='utf-8') as f:
+        json.dump(model, f)
+    for extra in ('metadata.json', 'labels.json'):
+        if (model_dir / extra).exists():
+            shutil.copy2(model_dir / extra, out_dir / extra)
+
+    optimized = verify_manifest(out_dir)
+    print(f"✅ Manifest verified: {len(paths)} shard(s), {optimized:,} bytes "
+          f"(was {original:,}, {optimized / original:.0%}); max weight error {max_error:.3g}")
+    return {'original_bytes': original, 'optimized_bytes': optimized,
+            'shards': len(paths), 'max_weight_error': max_error}
+
+def sample_images(train_dir='train', count=32, seed=0):
+    """Picks sample images from train/ for the output-difference report"""
+    import random
+    paths = sorted(p for p in Path(train_dir).glob('*/*') if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+def output_report(model_dir, out_dir, images):
+    """
+    Runs the original and the optimized model on the same images and
+    reports top-1 agreement and the largest change in class probability.
+    """
+    from PIL import Image
+    import tfjs_model
+
+    original = tfjs_model.load_layers_model(model_dir)
+    optimized = tfjs_model.load_layers_model(out_dir)
+    scale, offset = tfjs_model.input_scaling(model_dir)
+    height, width = original.input_shape[1:3]
+
+    batch = np.stack([
+        np.asarray(Image.open(p).convert('RGB').resize((width, height)), dtype=np.float32)
+        for p in images
+    ]) * scale + offset
+
+    a = np.asarray(original(batch, training=False))
+    b = np.asarray(optimized(batch, training=False))
+    diff = np.abs(a - b)
+    report = {
+        'images': len(images),
+        'top1_agreement': float(np.mean(a.argmax(axis=1) == b.argmax(axis=1))),
+        'max_prob_diff': float(diff.max()),
+        'mean_prob_diff': float(diff.mean()),
+    }
+    print(f"📈 Output difference on {len(images)} images: top-1 agreement {report['top1_agreement']:.1%}, "
+          f"max |Δp| {report['max_prob_diff']:.4f}, mean |Δp| {report['mean_prob_diff']:.5f}")
+    return report
+
+def optimize_main(argv):
+    parser = argparse.ArgumentParser(prog='fix_model.py optimize',
+                                     description='Quantize and re-pack TF.js layers-model weights')
+    parser.add_argument('model_dir')
+    parser.add_argument('out_dir')
+    parser.add_argument('--quantize', choices=['float16', 'uint8', 'none'], default='float16')
+    parser.add_argument('--shard-size', type=int, default=4 * 1024 * 1024,
+                        help='Target shard size in bytes (default 4 MB)')
+    parser.add_argument('--samples', type=int, default=32,
+                        help='Sample images from train/ for the output-difference report (0 = skip)')
+    parser.add_argument('--train-dir', default='train')
+    args = parser.parse_args(argv)
+
+    report = optimize_artifacts(args.model_dir, args.out_dir,
+                                None if args.quantize == 'none' else args.quantize, args.shard_size)
+    if args.samples:
+        images = sample_images(args.train_dir, args.samples)
+        if images:
+            report.update(output_report(args.model_dir, args.out_dir, images))
+        else:
+            print(f"⚠️ No images in {args.train_dir}/, skipping the output-difference report")
+    with open(Path(args.out_dir) / 'optimize_report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'optimize':
+        optimize_main(sys.argv[2:])
+        sys.exit(0)
+
     input_file = 'docs/model/model.json'
     output_file = 'docs/model/model.json'
     
@@ -0,0 +1,230 @@
+"""
+Local inference server with dynamic micro-batching
+Wraps Classifier in an asyncio HTTP service so weak kiosks can offload
+classification to one CPU box.
+
+Concurrent requests are collected into micro-batches (up to --max-batch
+images, waiting at most --max-wait-ms after the first one) and each batch is
+one Classifier.predict_batch call on a dedicated inference thread. When more
+than --max-queue images are waiting, new requests get 503 + Retry-After
+instead of piling up.
+
+Endpoints:
+    POST /predict   image as the raw request body or multipart field "image"
+                    -> same JSON as Classifier.predict
+    GET  /metrics   queue depth, batch size histogram, latencies, rejections
+    GET  /health
+
+Usage:
+    pip install aiohttp
+    python inference_server.py --model docs/model --port 8080
+    curl -X POST --data-binary @bottle.jpg http://localhost:8080/predict
+"""
+
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from classifier import Classifier
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+
+class Overloaded(Exception):
+    """Raised when the batching queue is full"""
+
+
+class MicroBatcher:
+    """
+    Collects single-image requests into batches for one model call.
+    max_batch: largest batch per model call.
+    max_wait_ms: how long the first request of a batch waits for company.
+    max_queue: waiting requests before new ones are rejected (backpressure).
+    """
+
+    def __init__(self, classifier, max_batch=16, max_wait_ms=5, max_queue=64):
+        self.classifier = classifier
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        # One inference thread: batches run back to back while the event loop keeps accepting requests
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.task = None
+
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batch_sizes = {}
+        self.inference_time = 0.0
+        self.wait_time = 0.0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, frame):
+        """Queues one BGR frame and waits for its result dict"""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((frame, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise Overloaded()
+        self.requests += 1
+        return await future
+
+    async def _collect(self):
+        """Waits for one request, then gathers more until max_batch or max_wait"""
+        batch = [await self.queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            frames = [frame for frame, _, _ in batch]
+            start = time.perf_counter()
+            self.wait_time += sum(start - queued for _, _, queued in batch)
+            try:
+                results = await loop.run_in_executor(self.executor, self.classifier.predict_batch, frames)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.inference_time += time.perf_counter() - start
+            self.batches += 1
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            for (_, future, _), result in zip(batch, results):
+                # The client may have disconnected and cancelled its future
+                if not future.done():
+                    future.set_result(result)
+
+    def metrics(self):
+        images = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "mean_batch_size": images / self.batches if self.batches else 0.0,
+            "mean_queue_wait_ms": 1000 * self.wait_time / images if images else 0.0,
+            "mean_batch_inference_ms": 1000 * self.inference_time / self.batches if self.batches else 0.0,
+        }
+
+
+def decode_image(data):
+    """Decodes uploaded image bytes to a BGR frame (None if not an image)"""
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+async def read_upload(request):
+    """Image bytes from a multipart field "image" or from the raw body"""
+    if request.content_type.startswith('multipart/'):
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == 'image':
+                return await part.read(decode=False)
+        return None
+    return await request.read()
+
+
+async def handle_predict(request):
+    batcher = request.app['batcher']
+    data = await read_upload(request)
+    if not data:
+        return web.json_response({"error": "no image uploaded"}, status=400)
+
+    frame = await asyncio.get_running_loop().run_in_executor(None, decode_image, data)
+    if frame is None:
+        return web.json_response({"error": "cannot decode image"}, status=400)
+
+    try:
+        result = await batcher.submit(frame)
+    except Overloaded:
+        return web.json_response({"error": "server overloaded, retry later"}, status=503,
+                                 headers={"Retry-After": "1"})
+    return web.json_response(result)
+
+
+async def handle_metrics(request):
+    return web.json_response({**request.app['batcher'].metrics(), "model_version": request.app['model_version']})
+
+
+async def handle_health(request):
+    return web.json_response({"status": "ok"})
+
+
+def create_app(classifier, max_batch=16, max_wait_ms=5, max_queue=64, client_max_size=16 * 1024 * 1024):
+    app = web.Application(client_max_size=client_max_size)
+    app['model_version'] = classifier.version
+
+    async def on_startup(app):
+        app['batcher'] = MicroBatcher(classifier, max_batch, max_wait_ms, max_queue)
+        app['batcher'].start()
+
+    async def on_cleanup(app):
+        await app['batcher'].stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post('/predict', handle_predict)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/health', handle_health)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local inference server with dynamic micro-batching")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--model", metavar="DIR",
+                        help="Use our trained TF.js model (e.g. docs/model) instead of ImageNet MobileNetV2")
+    parser.add_argument("--engine", choices=["keras", "tflite"], default="keras")
+    parser.add_argument("--tflite", metavar="FILE",
+                        help="TFLite model for --engine tflite (default: <model>/model_int8.tflite)")
+    parser.add_argument("--threads", type=int, help="CPU threads for the tflite engine")
+    parser.add_argument("--max-batch", type=int, default=16, help="Largest batch per model call")
+    parser.add_argument("--max-wait-ms", type=float, default=5,
+                        help="How long a request waits for others to join its batch")
+    parser.add_argument("--max-queue", type=int, default=64,
+                        help="Waiting images before new requests get 503 (backpressure)")
+    args = parser.parse_args()
+
+    if web is None:
+        parser.error("the inference server needs aiohttp: pip install aiohttp "
+                     "(or pip install -r requirements.txt)")
+
+    classifier = Classifier(model_dir=args.model, engine=args.engine,
+                            tflite_path=args.tflite, num_threads=args.threads)
+    # Trace the compiled forward pass before the first request arrives
+    classifier.predict_batch([np.zeros((224, 224, 3), dtype=np.uint8)])
+
+    app = create_app(classifier, args.max_batch, args.max_wait_ms, args.max_queue)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Content-addressed prediction cache
+Maps the resized 224x224 RGB model input to the model's score vector, so an
+image that was already classified (re-uploads, repeated runs over train/,
+a still image shown in a loop) skips the forward pass.
+
+Keys:
+    exact       BLAKE2 hash of the input pixels (identical input only)
+    perceptual  64-bit DCT pHash (dataset_manifest.phash), so re-encoded or
+                slightly changed copies of an image share one entry
+
+Every key is scoped to the model version (a content hash of the loaded
+weights): a different model never sees another model's scores, and the
+disk tier keeps one directory per version.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+MODES = ("exact", "perceptual")
+CACHE_DIR = Path(__file__).parent / ".prediction_cache"
+
+
+class PredictionCache:
+    """
+    Bounded in-memory LRU of score vectors with an optional on-disk tier.
+    model_version: version of the model whose scores are cached.
+    mode: "exact" or "perceptual" (see module docstring).
+    max_entries: in-memory entries before the least recently used is evicted.
+    disk_dir: directory of the persistent tier (None = memory only).
+    """
+
+    def __init__(self, model_version, mode="exact", max_entries=1024, disk_dir=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.disk_root = Path(disk_dir) if disk_dir else None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.set_model_version(model_version)
+
+    def set_model_version(self, model_version):
+        """Drops every in-memory entry when the model changes"""
+        with self.lock:
+            if getattr(self, 'model_version', None) != model_version:
+                self.entries.clear()
+            self.model_version = model_version
+            self.disk_dir = self.disk_root / model_version if self.disk_root else None
+            if self.disk_dir:
+                self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def key(self, rgb):
+        """Cache key of one resized uint8 RGB input image"""
+        if self.mode == "exact":
+            return hashlib.blake2b(np.ascontiguousarray(rgb).data, digest_size=16).hexdigest()
+        from PIL import Image
+        from dataset_manifest import phash
+        return "p" + phash(Image.fromarray(rgb))
+
+    def get(self, key):
+        """Cached score vector or None"""
+        with self.lock:
+            scores = self.entries.get(key)
+            if scores is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return scores
+
+        if self.disk_dir:
+            path = self.disk_dir / f"{key}.npy"
+            if path.exists():
+                try:
+                    scores = np.load(path)
+                except (OSError, ValueError):
+                    scores = None
+                if scores is not None:
+                    with self.lock:
+                        self.disk_hits += 1
+                    self._remember(key, scores)
+                    return scores
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, scores):
+        scores = np.array(scores, dtype=np.float32)
+        self._remember(key, scores)
+        if self.disk_dir:
+            # Write to a temporary file first so readers never see a partial entry
+            path = self.disk_dir / f"{key}.npy"
+            tmp = self.disk_dir / f".{key}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp, scores)
+            os.replace(tmp, path)
+
+    def _remember(self, key, scores):
+        with self.lock:
+            self.entries[key] = scores
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "mode": self.mode,
+            "model_version": self.model_version,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"Prediction cache ({s['mode']}): {s['hits']} hits, {s['disk_hits']} disk hits, "
+                f"{s['misses']} misses ({s['hit_rate']:.0%} hit rate), {s['evictions']} evictions")
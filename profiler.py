@@ -0,0 +1,148 @@
+"""
+Per-stage latency instrumentation
+Records how long each stage of the inference hot path takes (preprocess,
+inference, postprocess, ...) into rolling windows, so percentiles,
+histograms and rates can be read while the app is running, and optionally
+keeps every span of a session for export as a Chrome trace
+(chrome://tracing or https://ui.perfetto.dev).
+
+Classifier takes an optional Profiler; without one, every stage is a shared
+no-op context manager, so instrumentation that is turned off costs close
+to nothing.
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+# Returned by Classifier when no profiler is attached
+NULL_STAGE = nullcontext()
+
+# Number of most recent samples kept per stage
+WINDOW = 512
+
+
+class _Span:
+    """Times one stage; created by Profiler.stage()"""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Profiler:
+    """
+    Rolling per-stage timings.
+    window: samples kept per stage for percentiles/histograms/rates.
+    trace: also keep every span of the session for export_chrome_trace().
+    """
+
+    def __init__(self, window=WINDOW, trace=False):
+        self.window = window
+        self.trace = trace
+        self.durations = {}
+        self.ends = {}
+        self.events = []
+        self.origin = time.perf_counter()
+
+    def _series(self, name):
+        if name not in self.durations:
+            self.durations[name] = deque(maxlen=self.window)
+            self.ends[name] = deque(maxlen=self.window)
+        return self.durations[name], self.ends[name]
+
+    def stage(self, name):
+        """Context manager that records the duration of the enclosed block as stage `name`"""
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        """Records one span (perf_counter timestamps)"""
+        durations, ends = self._series(name)
+        durations.append(end - start)
+        ends.append(end)
+        if self.trace:
+            self.events.append((name, start, end, threading.get_ident()))
+
+    def tick(self, name):
+        """Records an instantaneous event, e.g. a captured frame (used for rates)"""
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    def rate(self, name):
+        """Events per second over the rolling window"""
+        ends = self.ends.get(name)
+        if not ends or len(ends) < 2:
+            return 0.0
+        span = ends[-1] - ends[0]
+        return (len(ends) - 1) / span if span > 0 else 0.0
+
+    def percentile(self, name, q):
+        """q-th percentile of the stage's duration in milliseconds"""
+        durations = self.durations.get(name)
+        if not durations:
+            return 0.0
+        return float(np.percentile(np.fromiter(durations, dtype=np.float64), q) * 1000)
+
+    def histogram(self, name, bins=20):
+        """(counts, bin edges in ms) of the stage's rolling window"""
+        durations = np.fromiter(self.durations.get(name, ()), dtype=np.float64) * 1000
+        return np.histogram(durations, bins=bins)
+
+    def stats(self):
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, rate_hz}} for the rolling window"""
+        result = {}
+        for name, durations in list(self.durations.items()):
+            ms = np.fromiter(durations, dtype=np.float64) * 1000
+            if not len(ms):
+                continue
+            p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+            result[name] = {
+                "count": len(ms),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(ms.max()),
+                "rate_hz": self.rate(name),
+            }
+        return result
+
+    def export_chrome_trace(self, path):
+        """Writes the recorded session in Chrome trace event format (requires trace=True)"""
+        pid = os.getpid()
+        events = []
+        for name, start, end, tid in list(self.events):
+            event = {"name": name, "pid": pid, "tid": tid, "ts": (start - self.origin) * 1e6}
+            if end > start:
+                event.update(ph="X", dur=(end - start) * 1e6)
+            else:
+                event.update(ph="i", s="t")
+            events.append(event)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def print_summary(self):
+        print(f"\n{'stage':<12} {'count':>6} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for name, s in self.stats().items():
+            if s["max_ms"] == 0:
+                # Instantaneous events (ticks) only have a rate
+                print(f"{name:<12} {s['count']:>6} {s['rate_hz']:>7.1f}/s")
+                continue
+            print(f"{name:<12} {s['count']:>6} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} "
+                  f"{s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
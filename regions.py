@@ -0,0 +1,147 @@
+"""
+Multi-object classification with region crops
+Classifier.predict squeezes the whole frame into 224x224 and returns one
+label, which is useless when a tray holds several items and turns small
+items into mush. Here a frame is cut into candidate regions:
+
+    tiles     fixed multi-scale square tiles with overlap
+    contours  bounding boxes of edge contours (cheap object proposals)
+
+All crops are classified in ONE Classifier.predict_batch call (crops are
+views of the frame, no copies), then confident recyclable crops are merged
+into one box per object.
+"""
+
+import cv2
+import numpy as np
+
+MODES = ("tiles", "contours")
+
+# Tile sides as a fraction of the frame's shorter side
+TILE_SCALES = (1.0, 0.5)
+TILE_OVERLAP = 0.25
+
+# Crops with the same label and at least this IoU are merged into one object
+MERGE_IOU = 0.3
+# A crop that has a smaller confident crop this much inside it is dropped (the
+# full frame and the scale-1.0 tiles would otherwise swallow separate objects)
+CONTAIN_FRACTION = 0.9
+
+
+def _starts(length, side, stride):
+    starts = list(range(0, max(length - side, 0) + 1, stride))
+    if starts[-1] + side < length:
+        starts.append(length - side)
+    return starts
+
+
+def tile_regions(shape, scales=TILE_SCALES, overlap=TILE_OVERLAP):
+    """Square multi-scale tiles as (x0, y0, x1, y1) boxes"""
+    h, w = shape[:2]
+    boxes = []
+    for scale in scales:
+        side = max(1, int(min(h, w) * scale))
+        stride = max(1, int(side * (1 - overlap)))
+        for y in _starts(h, side, stride):
+            for x in _starts(w, side, stride):
+                boxes.append((x, y, x + side, y + side))
+    return boxes
+
+
+def contour_regions(frame, max_regions=12, min_area=0.01, padding=0.15):
+    """
+    Object proposals from edge contours: bounding boxes of the largest contours,
+    padded and made square so the crop keeps the item's aspect ratio after resizing.
+    Always includes the full frame, so a single large item is still found.
+    """
+    h, w = frame.shape[:2]
+    small = cv2.resize(frame, (320, int(320 * h / w)), interpolation=cv2.INTER_AREA)
+    gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+    edges = cv2.dilate(cv2.Canny(gray, 50, 150), None, iterations=2)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    sx, sy = w / small.shape[1], h / small.shape[0]
+    boxes = [(0, 0, w, h)]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+        x, y, bw, bh = cv2.boundingRect(contour)
+        if bw * bh < min_area * small.shape[0] * small.shape[1]:
+            break
+        cx, cy = (x + bw / 2) * sx, (y + bh / 2) * sy
+        side = min(max(bw * sx, bh * sy) * (1 + 2 * padding), min(h, w))
+        x0 = int(np.clip(cx - side / 2, 0, w - side))
+        y0 = int(np.clip(cy - side / 2, 0, h - side))
+        boxes.append((x0, y0, x0 + int(side), y0 + int(side)))
+        if len(boxes) > max_regions:
+            break
+    return boxes
+
+
+def area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def intersection(a, b):
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    return ix * iy
+
+
+def iou(a, b):
+    """Intersection over union of two boxes"""
+    inter = intersection(a, b)
+    return inter / (area(a) + area(b) - inter) if inter else 0.0
+
+
+def contains_smaller(box, others, fraction=CONTAIN_FRACTION):
+    """True if a smaller box in others lies (at least `fraction`) inside box"""
+    return any(area(o) < area(box) and intersection(box, o) >= fraction * area(o) for o in others)
+
+
+def merge_detections(boxes, results, min_iou=MERGE_IOU):
+    """
+    Keeps recyclable (confident, non-garbage) crops, drops crops that contain a
+    smaller confident crop (coarse context crops such as the full frame), and
+    merges same-label crops with IoU >= min_iou into one detection:
+    {box, label, score, display_text, crops}.
+    """
+    confident = [(box, result) for box, result in zip(boxes, results) if result["is_recyclable"]]
+    confident_boxes = [box for box, _ in confident]
+    candidates = sorted(
+        ((box, result) for box, result in confident if not contains_smaller(box, confident_boxes)),
+        key=lambda item: item[1]["score"], reverse=True,
+    )
+    detections = [{"box": box, "label": result["label"], "score": result["score"], "crops": 1}
+                  for box, result in candidates]
+
+    # Merge until no two same-label detections overlap (a merged box can reach new neighbours)
+    merged = True
+    while merged:
+        merged = False
+        for i, a in enumerate(detections):
+            for b in detections[i + 1:]:
+                if a["label"] == b["label"] and iou(a["box"], b["box"]) >= min_iou:
+                    a["box"] = (min(a["box"][0], b["box"][0]), min(a["box"][1], b["box"][1]),
+                                max(a["box"][2], b["box"][2]), max(a["box"][3], b["box"][3]))
+                    a["crops"] += b["crops"]
+                    detections.remove(b)
+                    merged = True
+                    break
+            if merged:
+                break
+
+    for detection in detections:
+        detection["display_text"] = f"{detection['label']} ({detection['score']:.2f})"
+    return detections
+
+
+def detect_objects(classifier, frame, mode="tiles"):
+    """
+    Classifies region crops of a BGR frame in one batched call and returns
+    merged per-object detections (see merge_detections).
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown region mode '{mode}', expected one of {MODES}")
+    boxes = tile_regions(frame.shape) if mode == "tiles" else contour_regions(frame)
+    crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in boxes]
+    results = classifier.predict_batch(crops)
+    return merge_detections(boxes, results)
@@ -0,0 +1,92 @@
+"""
+Scene-change gating
+Decides per camera frame whether inference is needed. The kiosk camera is
+static most of the day, so frames are compared on a tiny grayscale
+thumbnail against the last frame that was classified:
+
+- scene unchanged            -> skip (the last result is still valid)
+- scene changed, still moving -> wait (motion blur would be classified)
+- scene changed, settled      -> infer now
+
+Comparing a 32x24 thumbnail costs a fraction of a millisecond, versus tens of
+milliseconds for a forward pass.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+THUMBNAIL_SIZE = (32, 24)
+
+
+class SceneGate:
+    """
+    diff_threshold: mean absolute thumbnail difference (0-255) from the last
+        classified frame that counts as a new scene.
+    motion_threshold: frame-to-frame difference below which the view is still.
+    settle_time: seconds the view must stay still after a change before inference.
+    max_interval: re-classify an unchanged scene after this many seconds (None = never).
+    """
+
+    def __init__(self, diff_threshold=6.0, motion_threshold=2.5, settle_time=0.15, max_interval=None):
+        self.diff_threshold = diff_threshold
+        self.motion_threshold = motion_threshold
+        self.settle_time = settle_time
+        self.max_interval = max_interval
+
+        self.reference = None
+        self.previous = None
+        self.still_since = None
+        self.last_inference = 0.0
+
+        self.frames = 0
+        self.inferred = 0
+
+    @staticmethod
+    def signature(frame):
+        """Downscaled grayscale thumbnail"""
+        small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def should_infer(self, frame, now=None):
+        """
+        Returns True if this frame should be classified (it then becomes the new reference).
+        """
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        sig = self.signature(frame)
+        motion = float(np.abs(sig - self.previous).mean()) if self.previous is not None else 0.0
+        self.previous = sig
+
+        if self.reference is None:
+            return self._accept(sig, now)
+
+        change = float(np.abs(sig - self.reference).mean())
+        if change < self.diff_threshold:
+            self.still_since = None
+            if self.max_interval is not None and now - self.last_inference >= self.max_interval:
+                return self._accept(sig, now)
+            return False
+
+        # New scene: wait until the view has stopped moving for settle_time
+        if motion > self.motion_threshold:
+            self.still_since = None
+            return False
+        if self.still_since is None:
+            self.still_since = now
+        if now - self.still_since >= self.settle_time:
+            return self._accept(sig, now)
+        return False
+
+    def _accept(self, sig, now):
+        self.reference = sig
+        self.still_since = None
+        self.last_inference = now
+        self.inferred += 1
+        return True
+
+    def summary(self):
+        skipped = self.frames - self.inferred
+        ratio = skipped / self.frames if self.frames else 0.0
+        return f"Scene gate: classified {self.inferred} of {self.frames} frames ({ratio:.0%} skipped)"
@@ -0,0 +1,223 @@
+"""
+SmartRecycle AI - 預先解碼的張量分片 (memory-mapped shards)
+把 train/ 的圖片一次解碼、縮放成 224x224x3 uint8，寫成固定大小的 .npy 分片，
+之後每次訓練直接以 np.load(mmap_mode='r') 讀取，不再解碼 JPEG。
+
+輸出結構:
+    .shards/
+    ├── index.json              # 尺寸、類別、來源檔案 (大小/修改時間) 與各分片筆數
+    ├── train/
+    │   ├── images-00000.npy    # (<=SHARD_SIZE, 224, 224, 3) uint8
+    │   ├── ...
+    │   └── labels.npy          # (N,) int32
+    └── val/
+        └── ...
+
+使用方式:
+    python tensor_shards.py                       # 打包 train/ (類別 = 子資料夾)
+    python tensor_shards.py --categories garbage metal_can paper paper_container plastic
+    python train_model.py --shards                # 從分片訓練 (過期時自動重新打包)
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+TRAIN_DIR = Path(__file__).parent / "train"
+SHARD_DIR = Path(__file__).parent / ".shards"
+IMAGE_SIZE = (224, 224)
+SHARD_SIZE = 1024
+VALIDATION_SPLIT = 0.2
+
+
+def _source_key(path):
+    stat = Path(path).stat()
+    return [Path(path).as_posix(), stat.st_size, stat.st_mtime]
+
+
+def decode(path, image_size=IMAGE_SIZE):
+    """解碼並縮放成 uint8 RGB"""
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB").resize(image_size, Image.BILINEAR), dtype=np.uint8)
+
+
+def _write_split(items, out_dir, image_size, shard_size):
+    """寫入一個 split 的影像分片與標籤，回傳各分片筆數"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("images-*.npy"):
+        old.unlink()
+
+    counts = []
+    for shard_index, start in enumerate(range(0, len(items), shard_size)):
+        chunk = items[start:start + shard_size]
+        shard_path = out_dir / f"images-{shard_index:05d}.npy"
+        tmp_path = out_dir / f".images-{shard_index:05d}.npy.tmp"
+        images = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8,
+                                           shape=(len(chunk), image_size[1], image_size[0], 3))
+        for i, (path, _) in enumerate(chunk):
+            images[i] = decode(path, image_size)
+        images.flush()
+        del images
+        os.replace(tmp_path, shard_path)
+        counts.append(len(chunk))
+        print(f"    {out_dir.name}: {start + len(chunk)}/{len(items)}", end="\r")
+
+    np.save(out_dir / "labels.npy", np.array([label for _, label in items], dtype=np.int32))
+    print()
+    return counts
+
+
+def pack(train, val, categories, out_dir=SHARD_DIR, image_size=IMAGE_SIZE, shard_size=SHARD_SIZE):
+    """
+    打包訓練/驗證集 (items 為 data_pipeline.list_images 的 [(path, label), ...])。
+    index.json 最後寫入，打包中斷時舊的 index 會被視為過期。
+    """
+    out_dir = Path(out_dir)
+    print(f"\n📦 打包張量分片 → {out_dir}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / "index.json"
+    if index_path.exists():
+        index_path.unlink()
+
+    index = {
+        "image_size": list(image_size),
+        "categories": list(categories),
+        "splits": {},
+    }
+    for name, items in (("train", train), ("val", val)):
+        index["splits"][name] = {
+            "shards": _write_split(items, out_dir / name, image_size, shard_size),
+            "sources": [_source_key(p) for p, _ in items],
+        }
+
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    print(f"  ✅ 訓練 {len(train)} 張、驗證 {len(val)} 張")
+    return index
+
+
+def is_current(train, val, categories, out_dir=SHARD_DIR, image_size=IMAGE_SIZE):
+    """分片是否與目前的 train/ 內容 (檔案、大小、修改時間、類別、尺寸) 一致"""
+    index_path = Path(out_dir) / "index.json"
+    if not index_path.exists():
+        return False
+    with open(index_path, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    if index["categories"] != list(categories) or index["image_size"] != list(image_size):
+        return False
+    for name, items in (("train", train), ("val", val)):
+        if index["splits"][name]["sources"] != [_source_key(p) for p, _ in items]:
+            return False
+    return True
+
+
+class ShardedSplit:
+    """
+    一個 split 的唯讀視圖: 分片以 mmap 開啟，取資料時只讀取用到的頁面。
+    """
+
+    def __init__(self, out_dir, name):
+        split_dir = Path(out_dir) / name
+        with open(Path(out_dir) / "index.json", 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.categories = self.index["categories"]
+        counts = self.index["splits"][name]["shards"]
+        self.shards = [np.load(split_dir / f"images-{i:05d}.npy", mmap_mode='r') for i in range(len(counts))]
+        self.starts = np.cumsum([0] + counts[:-1])
+        self.labels = np.load(split_dir / "labels.npy")
+
+    def __len__(self):
+        return len(self.labels)
+
+    def image(self, i):
+        """第 i 張影像 (mmap 視圖，不複製)"""
+        shard = int(np.searchsorted(self.starts, i, side='right')) - 1
+        return self.shards[shard][i - self.starts[shard]]
+
+    def batches(self, batch_size, shuffle=False, seed=None):
+        """
+        產生 (uint8 影像批次, 標籤) ；shuffle 時每個批次內依分片內位置排序，
+        讓讀取盡量連續。
+        """
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            idx = np.sort(order[start:start + batch_size]) if shuffle else order[start:start + batch_size]
+            yield np.stack([self.image(i) for i in idx]), self.labels[idx]
+
+
+def make_tf_dataset(split, batch_size, training=False, augment=None):
+    """
+    從分片建立 tf.data 管線，輸出與 data_pipeline.make_dataset 相同:
+    (float32 影像 [0, 1], one-hot 標籤)
+    """
+    import tensorflow as tf
+
+    num_classes = len(split.categories)
+    h, w = split.index["image_size"][1], split.index["image_size"][0]
+    epoch = [0]
+
+    def generator():
+        # 每個 epoch 換一個洗牌種子
+        epoch[0] += 1
+        yield from split.batches(batch_size, shuffle=training, seed=epoch[0] if training else None)
+
+    ds = tf.data.Dataset.from_generator(
+        generator,
+        output_signature=(
+            tf.TensorSpec([None, h, w, 3], tf.uint8),
+            tf.TensorSpec([None], tf.int32),
+        ),
+    )
+    ds = ds.map(lambda x, y: (tf.cast(x, tf.float32) / 255.0, tf.one_hot(y, num_classes)),
+                num_parallel_calls=tf.data.AUTOTUNE)
+    if training and augment is not None:
+        ds = ds.map(lambda x, y: (augment(x), y), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def keras_batches(split, batch_size, shuffle=False, transform=None):
+    """
+    給 Keras 2 model.fit 使用的無限產生器 (train_codespace.py / train_wsl.py):
+    (float32 影像 [0, 1], one-hot 標籤)。transform 為逐張增強函式 (例如 ImageDataGenerator.random_transform)。
+    """
+    num_classes = len(split.categories)
+    epoch = 0
+    while True:
+        epoch += 1
+        for images, labels in split.batches(batch_size, shuffle=shuffle, seed=epoch if shuffle else None):
+            x = images.astype(np.float32) / 255.0
+            if transform is not None:
+                x = np.stack([transform(img) for img in x])
+            yield x, np.eye(num_classes, dtype=np.float32)[labels]
+
+
+def steps(split, batch_size):
+    """每個 epoch 的批次數"""
+    return (len(split) + batch_size - 1) // batch_size
+
+
+def main():
+    from data_pipeline import list_images
+
+    parser = argparse.ArgumentParser(description="把 train/ 打包成預先解碼的 uint8 張量分片")
+    parser.add_argument("--train-dir", default=str(TRAIN_DIR))
+    parser.add_argument("--out", default=str(SHARD_DIR))
+    parser.add_argument("--categories", nargs="+",
+                        help="類別順序 (預設: train/ 子資料夾依名稱排序)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--keep-duplicates", action="store_true", help="不去除重複圖片")
+    args = parser.parse_args()
+
+    categories = args.categories or sorted(p.name for p in Path(args.train_dir).iterdir() if p.is_dir())
+    train, val = list_images(args.train_dir, categories, VALIDATION_SPLIT, not args.keep_duplicates)
+    pack(train, val, categories, args.out, IMAGE_SIZE, args.shard_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import collect_data
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MB
+PAYLOAD_SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support; the first full request is cut off halfway"""
+    requests = []
+    interrupt = True
+
+    def do_GET(self):
+        range_header = self.headers.get("Range")
+        type(self).requests.append(range_header)
+        start = int(range_header.split("=")[1].rstrip("-")) if range_header else 0
+        body = PAYLOAD[start:]
+
+        self.send_response(206 if range_header else 200)
+        self.send_header("Content-Length", str(len(body)))
+        if range_header:
+            self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        self.end_headers()
+
+        if type(self).interrupt and not range_header:
+            type(self).interrupt = False
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RangeHandler.requests = []
+    RangeHandler.interrupt = True
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/trashnet.zip"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_interrupted_download_resumes_and_verifies(server, tmp_path):
+    zip_path = tmp_path / "trashnet.zip"
+    part_path = tmp_path / "trashnet.zip.part"
+
+    assert collect_data.download_trashnet(server, zip_path, PAYLOAD_SHA256) is None
+    assert 0 < part_path.stat().st_size < len(PAYLOAD)
+    assert not zip_path.exists()
+
+    assert collect_data.download_trashnet(server, zip_path, PAYLOAD_SHA256) == zip_path
+    assert RangeHandler.requests[-1] == f"bytes={len(PAYLOAD) // 2}-"
+    assert zip_path.read_bytes() == PAYLOAD
+    assert not part_path.exists()
+
+
+def test_checksum_mismatch_discards_download(server, tmp_path):
+    RangeHandler.interrupt = False
+    zip_path = tmp_path / "trashnet.zip"
+
+    assert collect_data.download_trashnet(server, zip_path, "0" * 64) is None
+    assert not zip_path.exists()
+    assert not (tmp_path / "trashnet.zip.part").exists()
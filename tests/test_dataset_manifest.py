@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+
+from dataset_manifest import Manifest
+
+
+def make_train_dir(root):
+    rng = np.random.default_rng(0)
+    for label in ("paper", "plastic"):
+        (root / label).mkdir()
+        for i in range(3):
+            pixels = rng.integers(0, 255, (32, 32, 3), dtype=np.uint8)
+            Image.fromarray(pixels).save(root / label / f"{i}.png")
+    # Exact copy of paper/0.png filed under paper/ again
+    (root / "paper" / "copy.png").write_bytes((root / "paper" / "0.png").read_bytes())
+
+
+def test_files_reuses_the_duplicate_scan(tmp_path, monkeypatch):
+    make_train_dir(tmp_path)
+    manifest = Manifest(tmp_path)
+    manifest.update()
+
+    scans = []
+    original = Manifest.near_duplicates
+    monkeypatch.setattr(Manifest, "near_duplicates", lambda self, *a: scans.append(1) or original(self, *a))
+
+    paper = manifest.files("paper")
+    plastic = manifest.files("plastic")
+
+    assert len(scans) == 1
+    assert len(paper) == 3 and len(plastic) == 3
+    assert tmp_path / "paper" / "copy.png" not in paper
+
+
+def test_update_invalidates_the_cached_scan(tmp_path):
+    make_train_dir(tmp_path)
+    manifest = Manifest(tmp_path)
+    manifest.update()
+    assert len(manifest.files("plastic")) == 3
+
+    pixels = np.random.default_rng(1).integers(0, 255, (32, 32, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(tmp_path / "plastic" / "new.png")
+    manifest.update()
+
+    assert len(manifest.files("plastic")) == 4
@@ -0,0 +1,56 @@
+import numpy as np
+
+import regions
+
+
+def result(label, score=0.9, recyclable=True):
+    return {"label": label, "score": score, "is_recyclable": recyclable,
+            "display_text": f"{label} ({score:.2f})"}
+
+
+def test_separate_same_label_objects_stay_separate():
+    # Two cans in opposite corners: each is seen by its own small tile and by
+    # both scale-1.0 tiles, which must not absorb them into one box
+    boxes = [(0, 0, 480, 480), (160, 0, 640, 480), (0, 0, 240, 240), (400, 240, 640, 480)]
+    results = [result("metal_can", 0.8), result("metal_can", 0.8),
+               result("metal_can", 0.95), result("metal_can", 0.9)]
+
+    detections = regions.merge_detections(boxes, results)
+
+    assert len(detections) == 2
+    assert {d["box"] for d in detections} == {(0, 0, 240, 240), (400, 240, 640, 480)}
+    assert all(d["crops"] == 1 for d in detections)
+
+
+def test_overlapping_same_label_crops_merge():
+    boxes = [(0, 0, 240, 240), (60, 0, 300, 240)]
+    detections = regions.merge_detections(boxes, [result("plastic"), result("plastic", 0.8)])
+
+    assert len(detections) == 1
+    assert detections[0]["box"] == (0, 0, 300, 240)
+    assert detections[0]["crops"] == 2
+    assert detections[0]["score"] == 0.9
+
+
+def test_different_labels_and_unconfident_crops():
+    boxes = [(0, 0, 240, 240), (60, 0, 300, 240), (300, 200, 540, 440)]
+    results = [result("plastic"), result("paper"), result("garbage", recyclable=False)]
+
+    detections = regions.merge_detections(boxes, results)
+
+    assert sorted(d["label"] for d in detections) == ["paper", "plastic"]
+
+
+def test_detect_objects_classifies_all_crops_in_one_batch():
+    class FakeClassifier:
+        calls = []
+
+        def predict_batch(self, frames):
+            self.calls.append(len(frames))
+            return [result("paper", recyclable=False) for _ in frames]
+
+    classifier = FakeClassifier()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    assert regions.detect_objects(classifier, frame, "tiles") == []
+    assert classifier.calls == [len(regions.tile_regions(frame.shape))]
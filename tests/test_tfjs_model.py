@@ -0,0 +1,21 @@
+import json
+
+import tfjs_model
+
+
+def write_metadata(model_dir, metadata):
+    (model_dir / "metadata.json").write_text(json.dumps(metadata), encoding="utf-8")
+
+
+def test_input_scaling_defaults_to_rescale_255(tmp_path):
+    assert tfjs_model.input_scaling(tmp_path) == (1 / 255, 0.0)
+
+
+def test_input_scaling_teachable_machine(tmp_path):
+    write_metadata(tmp_path, {"packageName": "@teachablemachine/image", "labels": ["a"]})
+    assert tfjs_model.input_scaling(tmp_path) == (1 / 127.5, -1.0)
+
+
+def test_input_scaling_recorded_in_metadata_wins(tmp_path):
+    write_metadata(tmp_path, {"packageName": "smartrecycle", "inputScale": 1 / 255, "inputOffset": 0.0})
+    assert tfjs_model.input_scaling(tmp_path) == (1 / 255, 0.0)
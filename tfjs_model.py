@@ -0,0 +1,256 @@
+"""
+TensorFlow.js layers-model loader for Python
+Rebuilds the Keras model from the artifacts we ship for the web app
+(docs/model, result/N) so desktop and batch inference run the same model.
+
+Steps:
+1. Read model.json and undo the fix_model.py rewrites the installed Keras can't parse
+2. Memory-map the weight shards (.bin) listed in weightsManifest
+3. Slice every weight out of the shards and assign it by layer/weight name
+4. Read the class labels (labels.json or metadata.json) and the input scaling (metadata.json)
+"""
+
+import json
+import hashlib
+import copy
+from pathlib import Path
+
+import numpy as np
+
+import fix_model
+
+# dtype names used in weightsManifest
+DTYPES = {
+    'float32': np.float32,
+    'float16': np.float16,
+    'int32': np.int32,
+    'uint8': np.uint8,
+    'uint16': np.uint16,
+    'bool': np.bool_,
+}
+
+
+class ShardedWeights:
+    """
+    Read-only view over the concatenated weight shards of one manifest group.
+    Shards are memory-mapped, so a weight that lies inside a single shard is
+    returned as a view without copying; only weights crossing a shard
+    boundary are stitched together.
+    """
+
+    def __init__(self, paths):
+        self.shards = []
+        self.offsets = []
+        offset = 0
+        for path in paths:
+            if not Path(path).exists():
+                raise FileNotFoundError(f"Weight shard not found: {path}")
+            shard = np.memmap(path, dtype=np.uint8, mode='r')
+            self.shards.append(shard)
+            self.offsets.append(offset)
+            offset += shard.size
+        self.size = offset
+
+    def read(self, offset, nbytes):
+        """Returns nbytes starting at offset as a uint8 array"""
+        end = offset + nbytes
+        if end > self.size:
+            raise ValueError(f"Weight data out of range: {offset}+{nbytes} > {self.size} bytes")
+
+        pieces = []
+        for shard, start in zip(self.shards, self.offsets):
+            stop = start + shard.size
+            if stop <= offset or start >= end:
+                continue
+            pieces.append(shard[max(offset, start) - start:min(end, stop) - start])
+
+        if len(pieces) == 1:
+            return pieces[0]
+        return np.concatenate(pieces)
+
+
+def dequantize(data, spec):
+    """Converts one manifest entry's raw bytes into a float array of the declared shape"""
+    shape = spec['shape']
+    quant = spec.get('quantization')
+
+    if not quant:
+        return data.view(DTYPES[spec['dtype']]).reshape(shape)
+
+    values = data.view(DTYPES[quant['dtype']]).reshape(shape)
+    if quant['dtype'] == 'float16':
+        return values.astype(np.float32)
+    # uint8 / uint16 affine quantization: value = q * scale + min
+    return values.astype(np.float32) * np.float32(quant['scale']) + np.float32(quant['min'])
+
+
+def spec_nbytes(spec):
+    """Number of bytes a manifest entry occupies in the shards"""
+    quant = spec.get('quantization')
+    dtype = DTYPES[quant['dtype'] if quant else spec['dtype']]
+    return int(np.prod(spec['shape'], dtype=np.int64)) * np.dtype(dtype).itemsize
+
+
+def read_weights(model_dir, manifest):
+    """
+    Reads all weights of a weightsManifest into a dict {name: ndarray}.
+    Unquantized weights are views into the memory-mapped shards.
+    """
+    model_dir = Path(model_dir)
+    weights = {}
+    for group in manifest:
+        buffer = ShardedWeights([model_dir / p for p in group['paths']])
+        offset = 0
+        for spec in group['weights']:
+            nbytes = spec_nbytes(spec)
+            weights[spec['name']] = dequantize(buffer.read(offset, nbytes), spec)
+            offset += nbytes
+    return weights
+
+
+def keras_major_version():
+    import tensorflow as tf
+    version = getattr(tf.keras, '__version__', None) or tf.keras.version()
+    return int(str(version).split('.')[0])
+
+
+def unfix_layer_config(layer, keras_major):
+    """
+    Reverse of fix_model.fix_layer_config: rewrites a layer config written for
+    TF.js back into something the installed Keras can deserialize.
+    """
+    config = layer.get('config', {})
+
+    if keras_major >= 3:
+        # Keras 3 understands the legacy inbound_nodes lists, it only needs batch_shape back
+        if layer.get('class_name') == 'InputLayer':
+            for key in ('batchInputShape', 'batch_input_shape'):
+                if key in config:
+                    config['batch_shape'] = config.pop(key)
+        elif 'batch_input_shape' in config:
+            # First layer of a legacy Sequential (e.g. Teachable Machine's dense head)
+            config['input_shape'] = config.pop('batch_input_shape')[1:]
+    else:
+        # Keras 2 can't read Keras 3 configs at all: apply the forward fixes
+        layer = fix_model.fix_layer_config(layer)
+        config = layer['config']
+        if layer.get('class_name') == 'InputLayer':
+            for key in ('batchInputShape', 'batch_shape'):
+                if key in config:
+                    config['batch_input_shape'] = config.pop(key)
+
+    # Nested models (Teachable Machine exports a Sequential of Sequentials)
+    if isinstance(config.get('layers'), list):
+        config['layers'] = [unfix_layer_config(sub, keras_major) for sub in config['layers']]
+
+    layer['config'] = config
+    return layer
+
+
+def build_model(topology):
+    """Rebuilds the (untrained) Keras model from modelTopology"""
+    import tensorflow as tf
+
+    # Keras 3 exports wrap the model config as {"model_config": ...}
+    model_config = copy.deepcopy(topology.get('model_config', topology))
+    model_config = unfix_layer_config(model_config, keras_major_version())
+
+    return tf.keras.models.model_from_json(json.dumps(model_config))
+
+
+def leaf_layers(model):
+    """Yields all layers that own weights, descending into nested models"""
+    for layer in model.layers:
+        if hasattr(layer, 'layers'):
+            yield from leaf_layers(layer)
+        else:
+            yield layer
+
+
+def assign_weights(model, weights):
+    """Assigns manifest weights to the model by '<layer name>/<weight name>'"""
+    missing = []
+    for layer in leaf_layers(model):
+        if not layer.weights:
+            continue
+        values = []
+        for w in layer.weights:
+            # Keras 3: "kernel", Keras 2: "Conv1/kernel:0"
+            short_name = w.name.split('/')[-1].split(':')[0]
+            key = f"{layer.name}/{short_name}"
+            value = weights.get(key)
+            if value is None:
+                # Older exports prefix the weight with the enclosing model name
+                matches = [v for k, v in weights.items() if k.endswith('/' + key)]
+                value = matches[0] if len(matches) == 1 else None
+            if value is None:
+                missing.append(key)
+                continue
+            values.append(value)
+        if len(values) == len(layer.weights):
+            layer.set_weights(values)
+
+    if missing:
+        raise ValueError(f"weightsManifest has no data for {len(missing)} weights, e.g. {missing[:5]}")
+
+
+def load_labels(model_dir):
+    """Reads class labels from labels.json or Teachable Machine metadata.json"""
+    model_dir = Path(model_dir)
+    labels_path = model_dir / 'labels.json'
+    if labels_path.exists():
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    metadata_path = model_dir / 'metadata.json'
+    if metadata_path.exists():
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            return json.load(f)['labels']
+
+    raise FileNotFoundError(f"No labels.json or metadata.json in {model_dir}")
+
+
+def input_scaling(model_dir):
+    """
+    Returns (scale, offset) so that model input = pixel * scale + offset.
+    Our own exports record it in metadata.json (inputScale / inputOffset, written by
+    train_model.write_metadata). Teachable Machine models expect [-1, 1] (tmImage
+    divides by 127.5 and subtracts 1); anything else is assumed to be trained with
+    rescale=1./255 (see predictWithCustomModel in app.js).
+    """
+    metadata_path = Path(model_dir) / 'metadata.json'
+    if metadata_path.exists():
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if 'inputScale' in metadata:
+            return float(metadata['inputScale']), float(metadata.get('inputOffset', 0.0))
+        if metadata.get('packageName') == '@teachablemachine/image':
+            return 1.0 / 127.5, -1.0
+    return 1.0 / 255.0, 0.0
+
+
+def model_version(model_dir):
+    """Short content hash of model.json and the weight files it references"""
+    model_dir = Path(model_dir)
+    digest = hashlib.sha256()
+    model_json = (model_dir / 'model.json').read_bytes()
+    digest.update(model_json)
+    for group in json.loads(model_json).get('weightsManifest', []):
+        for p in group['paths']:
+            with open(model_dir / p, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def load_layers_model(model_dir):
+    """
+    Loads a TF.js layers-model directory (model.json + shards) as a Keras model.
+    """
+    model_dir = Path(model_dir)
+    with open(model_dir / 'model.json', 'r', encoding='utf-8') as f:
+        artifact = json.load(f)
+
+    model = build_model(artifact['modelTopology'])
+    assign_weights(model, read_weights(model_dir, artifact['weightsManifest']))
+    return model
@@ -0,0 +1,70 @@
+"""
+TFLite inference engine
+Runs the .tflite models written by train_model.export_to_tflite (float16 / full int8).
+
+The interpreter applies the XNNPACK delegate by default on CPU, for both float
+and quantized models; num_threads sets its thread pool size.
+Uses the small tflite_runtime package when installed (edge boxes), otherwise
+falls back to tf.lite from full TensorFlow.
+"""
+
+import numpy as np
+
+
+def make_interpreter(model_path, num_threads=None):
+    """Creates a TFLite interpreter (XNNPACK on CPU)"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=str(model_path), num_threads=num_threads)
+
+
+class TFLiteEngine:
+    """
+    Float-in / float-out wrapper around a TFLite interpreter.
+    Quantized (int8/uint8) input and output tensors are converted with the
+    tensor's own scale and zero point, so callers always use the float
+    preprocessing of the original Keras model.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = str(model_path)
+        self.interpreter = make_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input_detail['shape'][0])
+
+    def _resize(self, batch_size):
+        """Resizes the input tensor to a new batch size (re-plans the graph once)"""
+        shape = list(self.input_detail['shape'])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self.input_detail['index'], shape)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+    def run(self, batch):
+        """Runs a float32 batch (N, H, W, 3) and returns float32 scores (N, classes)"""
+        if batch.shape[0] != self.batch_size:
+            self._resize(batch.shape[0])
+
+        dtype = self.input_detail['dtype']
+        if dtype in (np.int8, np.uint8):
+            scale, zero_point = self.input_detail['quantization']
+            info = np.iinfo(dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+        else:
+            batch = batch.astype(dtype, copy=False)
+
+        self.interpreter.set_tensor(self.input_detail['index'], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output_detail['index'])
+
+        if self.output_detail['dtype'] in (np.int8, np.uint8):
+            scale, zero_point = self.output_detail['quantization']
+            return (output.astype(np.float32) - zero_point) * scale
+        return output.astype(np.float32, copy=False)
@@ -7,9 +7,11 @@ GitHub Codespaces 訓練腳本
 
 執行:
     python train_codespace.py
+    python train_codespace.py --shards   # 從預先解碼的張量分片訓練 (先執行 python tensor_shards.py)
 """
 
 import os
+import sys
 os.environ['TF_USE_LEGACY_KERAS'] = '1'  # 使用 Keras 2 API
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
 
@@ -51,17 +53,31 @@ def main():
         validation_split=0.2
     )
     
-    train_gen = datagen.flow_from_directory(
-        TRAIN_DIR, target_size=(224, 224), batch_size=16,
-        class_mode='categorical', classes=CATEGORIES, subset='training'
-    )
-    
-    val_gen = datagen.flow_from_directory(
-        TRAIN_DIR, target_size=(224, 224), batch_size=16,
-        class_mode='categorical', classes=CATEGORIES, subset='validation'
-    )
-    
-    print(f"\n  訓練: {train_gen.samples}, 驗證: {val_gen.samples}")
+    fit_steps = {}
+    if '--shards' in sys.argv:
+        # 預先解碼的 uint8 張量分片 (mmap 讀取，不再解碼 JPEG)
+        from tensor_shards import SHARD_DIR, ShardedSplit, keras_batches, steps
+        train_split = ShardedSplit(SHARD_DIR, "train")
+        val_split = ShardedSplit(SHARD_DIR, "val")
+        if train_split.categories != CATEGORIES:
+            print(f"  ❌ 分片類別 {train_split.categories} 與 CATEGORIES 不符，請重新執行 tensor_shards.py --categories ...")
+            return
+        train_gen = keras_batches(train_split, 16, shuffle=True, transform=datagen.random_transform)
+        val_gen = keras_batches(val_split, 16)
+        fit_steps = dict(steps_per_epoch=steps(train_split, 16), validation_steps=steps(val_split, 16))
+        print(f"\n  訓練: {len(train_split)}, 驗證: {len(val_split)} (張量分片)")
+    else:
+        train_gen = datagen.flow_from_directory(
+            TRAIN_DIR, target_size=(224, 224), batch_size=16,
+            class_mode='categorical', classes=CATEGORIES, subset='training'
+        )
+    
+        val_gen = datagen.flow_from_directory(
+            TRAIN_DIR, target_size=(224, 224), batch_size=16,
+            class_mode='categorical', classes=CATEGORIES, subset='validation'
+        )
+    
+        print(f"\n  訓練: {train_gen.samples}, 驗證: {val_gen.samples}")
     
     # 建立模型
     print("\n🏗️ 建立模型...")
@@ -78,7 +94,7 @@ def main():
     
     # 訓練
     print("\n🚀 開始訓練...")
-    history = model.fit(train_gen, epochs=10, validation_data=val_gen, verbose=1)
+    history = model.fit(train_gen, epochs=10, validation_data=val_gen, verbose=1, **fit_steps)
     
     print(f"\n📈 最終驗證準確率: {history.history['val_accuracy'][-1]:.2%}")
     
@@ -11,6 +11,11 @@ SmartRecycle AI - MobileNetV2 Transfer Learning 訓練腳本
 
 使用方式:
     python train_model.py
+    python train_model.py --cached-features   # 骨幹特徵快取模式 (只訓練頂層)
+    python train_model.py --shards            # 從預先解碼的張量分片訓練 (tensor_shards.py)
+    python train_model.py --backbone mobilenet_v2_0.5 --input-size 160   # 指定骨幹與輸入尺寸
+    python train_model.py --sweep --cached-features --target-accuracy 0.9
+                                              # 逐一訓練候選骨幹，量測延遲與大小，選出達標的最小模型
 
 依賴套件:
     pip install tensorflow tensorflowjs Pillow
@@ -18,91 +23,149 @@ SmartRecycle AI - MobileNetV2 Transfer Learning 訓練腳本
 
 import os
 import json
+import argparse
+import time
+import random
 import shutil
 from pathlib import Path
 
+import numpy as np
+
 import tensorflow as tf
-from tensorflow.keras.applications import MobileNetV2
-from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout
+from tensorflow.keras.applications import MobileNetV2, MobileNetV3Small, MobileNetV3Large
+from tensorflow.keras.layers import Dense, GlobalAveragePooling2D, Dropout, Input, Resizing, Rescaling
 from tensorflow.keras.models import Model
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 
+from data_pipeline import list_images, make_dataset, make_augment, ThroughputLogger
+
 # ===== 設定 =====
 TRAIN_DIR = Path(__file__).parent / "train"
 MODEL_DIR = Path(__file__).parent / "docs" / "model"
+GRAPH_MODEL_DIR = MODEL_DIR / "graph"
 IMAGE_SIZE = (224, 224)
 BATCH_SIZE = 16
 EPOCHS = 20
 
+# TFLite int8 量化校正用的代表性樣本數 (從 train/ 隨機抽取)
+TFLITE_CALIBRATION_SAMPLES = 200
+
 # 類別名稱 (順序很重要！)
 CATEGORIES = ["garbage", "metal_can", "paper", "paper_container", "plastic"]
 
+# 資料增強參數 (與 ImageDataGenerator 同名同義；tf.data 訓練管線與特徵快取模式共用)
+# 在計算圖中對整批影像執行，見 data_pipeline.make_augment
+AUGMENTATION = dict(
+    rotation_range=20,
+    width_shift_range=0.2,
+    height_shift_range=0.2,
+    shear_range=0.2,
+    zoom_range=0.2,
+    horizontal_flip=True,
+    fill_mode='nearest',
+)
+VALIDATION_SPLIT = 0.2
+# 使用 dataset_manifest 去除重複圖片 (內容相同或 pHash 相近)
+DEDUPLICATE = True
+
+# 特徵快取: 每張圖片的增強版本數 (骨幹版本見 backbone_version)
+FEATURE_VARIANTS = 5
+
+# 可選骨幹: 名稱 -> (建構函式, 參數)
+# MobileNetV2 沿用本專案的 [0, 1] 輸入；MobileNetV3 在模型內轉成它原生的 [-1, 1]
+BACKBONES = {
+    "mobilenet_v2_0.35": (MobileNetV2, dict(alpha=0.35)),
+    "mobilenet_v2_0.5": (MobileNetV2, dict(alpha=0.5)),
+    "mobilenet_v2_0.75": (MobileNetV2, dict(alpha=0.75)),
+    "mobilenet_v2_1.0": (MobileNetV2, dict(alpha=1.0)),
+    "mobilenet_v3_small": (MobileNetV3Small, dict(include_preprocessing=False)),
+    "mobilenet_v3_large": (MobileNetV3Large, dict(include_preprocessing=False)),
+}
+DEFAULT_BACKBONE = "mobilenet_v2_1.0"
+# 骨幹實際運算的輸入尺寸；匯出的模型一律接收 IMAGE_SIZE，在模型內縮放
+INPUT_SIZES = (128, 160, 192, 224)
+
+# 骨幹掃描 (--sweep): 候選模型與報告存放處，及 CPU 延遲量測次數
+SWEEP_DIR = Path(__file__).parent / ".backbone_sweep"
+LATENCY_RUNS = 30
+
 
-def prepare_data():
-    """準備訓練資料"""
+def prepare_data(cache="memory", deduplicate=DEDUPLICATE, shards=False):
+    """準備訓練資料 (tf.data 管線)"""
     print("\n📊 準備訓練資料...")
     
+    # 固定切分: 每個類別排序後前 20% 為驗證集
+    train_items, val_items = list_images(TRAIN_DIR, CATEGORIES, VALIDATION_SPLIT, deduplicate)
+
     # 檢查資料夾
-    for cat in CATEGORIES:
+    for label, cat in enumerate(CATEGORIES):
         cat_dir = TRAIN_DIR / cat
         if not cat_dir.exists():
             print(f"  ⚠️ 找不到資料夾: {cat}")
             continue
-        count = len(list(cat_dir.glob("*.jpg")))
+        count = sum(1 for _, y in train_items + val_items if y == label)
         print(f"  📁 {cat}: {count} 張")
     
-    # 資料增強
-    train_datagen = ImageDataGenerator(
-        rescale=1./255,
-        rotation_range=20,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        shear_range=0.2,
-        zoom_range=0.2,
-        horizontal_flip=True,
-        fill_mode='nearest',
-        validation_split=0.2  # 20% 用於驗證
-    )
-    
-    # 訓練資料
-    train_generator = train_datagen.flow_from_directory(
-        TRAIN_DIR,
-        target_size=IMAGE_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        classes=CATEGORIES,
-        subset='training',
-        shuffle=True
-    )
-    
-    # 驗證資料
-    val_generator = train_datagen.flow_from_directory(
-        TRAIN_DIR,
-        target_size=IMAGE_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        classes=CATEGORIES,
-        subset='validation',
-        shuffle=False
-    )
+    if shards:
+        # 預先解碼的 uint8 分片 (mmap 讀取，不再解碼 JPEG)；train/ 有變動時重新打包
+        import tensor_shards
+        if not tensor_shards.is_current(train_items, val_items, CATEGORIES, tensor_shards.SHARD_DIR, IMAGE_SIZE):
+            tensor_shards.pack(train_items, val_items, CATEGORIES, tensor_shards.SHARD_DIR, IMAGE_SIZE)
+        train_ds = tensor_shards.make_tf_dataset(
+            tensor_shards.ShardedSplit(tensor_shards.SHARD_DIR, "train"), BATCH_SIZE,
+            training=True, augment=make_augment(**AUGMENTATION)
+        )
+        val_ds = tensor_shards.make_tf_dataset(
+            tensor_shards.ShardedSplit(tensor_shards.SHARD_DIR, "val"), BATCH_SIZE
+        )
+    else:
+        # 訓練資料 (資料增強)
+        train_ds = make_dataset(
+            train_items, len(CATEGORIES), IMAGE_SIZE, BATCH_SIZE,
+            training=True, cache=cache, cache_name="train", augment=make_augment(**AUGMENTATION)
+        )
+        
+        # 驗證資料 (不做資料增強)
+        val_ds = make_dataset(
+            val_items, len(CATEGORIES), IMAGE_SIZE, BATCH_SIZE,
+            training=False, cache=cache, cache_name="val"
+        )
     
-    print(f"\n  訓練樣本: {train_generator.samples}")
-    print(f"  驗證樣本: {val_generator.samples}")
-    print(f"  類別對應: {train_generator.class_indices}")
+    print(f"\n  訓練樣本: {len(train_items)}")
+    print(f"  驗證樣本: {len(val_items)}")
+    print(f"  類別對應: {dict((cat, i) for i, cat in enumerate(CATEGORIES))}")
     
-    return train_generator, val_generator
+    return train_ds, val_ds, len(train_items)
+
 
+def backbone_version(backbone=DEFAULT_BACKBONE, input_size=IMAGE_SIZE[0]):
+    """特徵快取用的骨幹版本 (骨幹、輸入尺寸或前處理改變時特徵就不同)"""
+    return f"{backbone}_{input_size}_imagenet_rescale255"
 
-def build_model(num_classes):
-    """建立 MobileNetV2 Transfer Learning 模型"""
-    print("\n🏗️ 建立模型...")
+
+def build_model(num_classes, backbone=DEFAULT_BACKBONE, input_size=IMAGE_SIZE[0]):
+    """
+    建立 Transfer Learning 模型。
+    backbone: BACKBONES 中的名稱；input_size: 骨幹的輸入邊長 (INPUT_SIZES)。
+    模型輸入固定為 IMAGE_SIZE，較小的 input_size 由模型第一層縮放，
+    所以 classifier.py、TF.js 前端與 TFLite 的前處理都不需要改。
+    """
+    print(f"\n🏗️ 建立模型 ({backbone}, {input_size}x{input_size})...")
+    constructor, kwargs = BACKBONES[backbone]
+
+    inputs = Input(shape=(*IMAGE_SIZE, 3))
+    x = inputs
+    if input_size != IMAGE_SIZE[0]:
+        x = Resizing(input_size, input_size)(x)
+    if constructor is not MobileNetV2:
+        x = Rescaling(2.0, offset=-1.0)(x)
     
-    # 載入預訓練的 MobileNetV2 (不含頂層)
-    base_model = MobileNetV2(
+    # 載入預訓練的骨幹 (不含頂層)
+    base_model = constructor(
         weights='imagenet',
         include_top=False,
-        input_shape=(224, 224, 3)
+        input_tensor=x,
+        **kwargs
     )
     
     # 凍結基礎模型的權重
@@ -115,7 +178,7 @@ def build_model(num_classes):
     x = Dropout(0.3)(x)
     predictions = Dense(num_classes, activation='softmax')(x)
     
-    model = Model(inputs=base_model.input, outputs=predictions)
+    model = Model(inputs=inputs, outputs=predictions)
     
     # 編譯模型
     model.compile(
@@ -130,7 +193,7 @@ def build_model(num_classes):
     return model
 
 
-def train_model(model, train_gen, val_gen):
+def train_model(model, train_ds, val_ds, train_samples):
     """訓練模型"""
     print("\n🚀 開始訓練...")
     
@@ -147,14 +210,15 @@ def train_model(model, train_gen, val_gen):
             monitor='val_accuracy',
             save_best_only=True,
             verbose=1
-        )
+        ),
+        ThroughputLogger(train_samples)
     ]
     
     # 訓練
     history = model.fit(
-        train_gen,
+        train_ds,
         epochs=EPOCHS,
-        validation_data=val_gen,
+        validation_data=val_ds,
         callbacks=callbacks,
         verbose=1
     )
@@ -162,58 +226,456 @@ def train_model(model, train_gen, val_gen):
     return history
 
 
-def export_to_tfjs(model):
-    """匯出為 TensorFlow.js 格式"""
+def train_with_feature_cache(model, variants=FEATURE_VARIANTS, deduplicate=DEDUPLICATE,
+                             version=backbone_version()):
+    """
+    特徵快取模式: 骨幹凍結，所以每張圖片 (與其 K 個增強版本) 的
+    GlobalAveragePooling2D 特徵只計算一次並存到磁碟，之後直接訓練頂層。
+    頂層與完整模型共用同一組 Dense/Dropout 層，訓練完即可直接匯出完整模型。
+    """
+    from feature_cache import FeatureCache
+
+    print(f"\n⚡ 特徵快取模式 (每張圖片 {variants} 個增強版本)...")
+
+    # 骨幹輸出 = 最後一個 GlobalAveragePooling2D (MobileNetV3 的 SE 區塊內也有)，其後的層即為頂層
+    pool_index = [i for i, layer in enumerate(model.layers)
+                  if isinstance(layer, GlobalAveragePooling2D)][-1]
+    pool = model.layers[pool_index]
+    extractor_model = Model(inputs=model.input, outputs=pool.output)
+    extractor = tf.function(lambda x: extractor_model(x, training=False))
+
+    augment_batch = make_augment(**AUGMENTATION)
+
+    def augment(img):
+        return augment_batch(img[None])[0].numpy()
+
+    def load_image(path):
+        img = tf.keras.utils.load_img(path, target_size=IMAGE_SIZE)
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+    cache = FeatureCache(version, extractor, load_image,
+                         augment=augment, batch_size=BATCH_SIZE * 2)
+
+    train, val = list_images(TRAIN_DIR, CATEGORIES, VALIDATION_SPLIT, deduplicate)
+    train_features = cache.features([p for p, _ in train], variants=variants)
+    val_features = cache.features([p for p, _ in val], variants=0)[:, 0]
+    print(f"  訓練樣本: {len(train)} x {1 + variants} 版本, 驗證樣本: {len(val)}")
+
+    train_labels = np.array([label for _, label in train])
+    val_labels = np.array([label for _, label in val])
+
+    # 每個增強版本都是一筆訓練資料
+    x_train = train_features.reshape(-1, train_features.shape[-1])
+    y_train = tf.keras.utils.to_categorical(np.repeat(train_labels, 1 + variants), len(CATEGORIES))
+    y_val = tf.keras.utils.to_categorical(val_labels, len(CATEGORIES))
+
+    features_in = tf.keras.Input(shape=(train_features.shape[-1],))
+    x = features_in
+    for layer in model.layers[pool_index + 1:]:
+        x = layer(x)
+    head = Model(inputs=features_in, outputs=x)
+    head.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    history = head.fit(
+        x_train, y_train,
+        batch_size=BATCH_SIZE,
+        epochs=EPOCHS,
+        validation_data=(val_features, y_val),
+        callbacks=[EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True, verbose=1)],
+        shuffle=True,
+        verbose=1
+    )
+
+    return history
+
+
+def measure_latency(model, runs=LATENCY_RUNS):
+    """單張影像 (batch 1) 的 CPU 推論延遲中位數 (ms)，與 classifier.py 相同使用固定簽名的 tf.function"""
+    forward = tf.function(lambda x: model(x, training=False),
+                          input_signature=[tf.TensorSpec([1, *IMAGE_SIZE, 3], tf.float32)])
+    x = tf.constant(np.random.default_rng(0).random((1, *IMAGE_SIZE, 3), dtype=np.float32))
+    times = []
+    with tf.device('/CPU:0'):
+        for _ in range(5):
+            forward(x).numpy()
+        for _ in range(runs):
+            start = time.perf_counter()
+            forward(x).numpy()
+            times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def artifact_size(model_dir):
+    """TF.js layers-model 匯出檔 (model.json + 權重分片) 的實際位元組數；沒有 model.json 時回傳 None"""
+    model_json = Path(model_dir) / "model.json"
+    if not model_json.exists():
+        return None
+    with open(model_json, 'r', encoding='utf-8') as f:
+        manifest = json.load(f).get("weightsManifest", [])
+    return model_json.stat().st_size + sum((Path(model_dir) / p).stat().st_size
+                                           for group in manifest for p in group["paths"])
+
+
+def export_candidate(model, out_dir):
+    """
+    把候選模型實際匯出並回傳 (大小, 格式): 優先匯出 TF.js layers-model (與 docs/model 相同格式)，
+    沒有 tensorflowjs 或轉換失敗時改匯出 float32 TFLite。
+    """
+    tfjs_dir = out_dir / "tfjs"
+    try:
+        import tensorflowjs as tfjs
+        tfjs.converters.save_keras_model(model, str(tfjs_dir))
+        return artifact_size(tfjs_dir), "tfjs"
+    except Exception as e:
+        print(f"  ⚠️ TF.js 匯出失敗 ({e})，改量測 TFLite 模型大小")
+        tflite_path = out_dir / "model.tflite"
+        tflite_path.write_bytes(tf.lite.TFLiteConverter.from_keras_model(model).convert())
+        return tflite_path.stat().st_size, "tflite"
+
+
+def pareto_front(results):
+    """標記不被其他候選支配的結果 (準確率不低、延遲與大小都不高，且至少一項更好)"""
+    for r in results:
+        r["pareto"] = not any(
+            o["val_accuracy"] >= r["val_accuracy"] and o["latency_ms"] <= r["latency_ms"]
+            and o["size_bytes"] <= r["size_bytes"]
+            and (o["val_accuracy"], o["latency_ms"], o["size_bytes"])
+            != (r["val_accuracy"], r["latency_ms"], r["size_bytes"])
+            for o in results
+        )
+    return results
+
+
+def select_backbone(results, target_accuracy):
+    """選出達到目標準確率的最小模型；沒有候選達標時選準確率最高者"""
+    passing = [r for r in results if r["val_accuracy"] >= target_accuracy]
+    if passing:
+        return min(passing, key=lambda r: (r["size_bytes"], r["latency_ms"]))
+    print(f"  ⚠️ 沒有候選達到目標準確率 {target_accuracy:.2%}，改選準確率最高者")
+    return max(results, key=lambda r: r["val_accuracy"])
+
+
+def sweep_backbones(candidates, train_ds, val_ds, train_samples, target_accuracy,
+                    cached_features=False, variants=FEATURE_VARIANTS, deduplicate=DEDUPLICATE):
+    """
+    骨幹掃描: 逐一訓練 (骨幹, 輸入尺寸) 候選，量測驗證準確率、CPU 延遲與實際匯出檔大小，
+    輸出 準確率 / 延遲 / 大小 表 (含 Pareto 前緣)，回傳達標的最小模型與全部結果。
+    每個候選存成 SWEEP_DIR/<名稱>/model.keras，報告存成 SWEEP_DIR/sweep_report.json。
+    """
+    print(f"\n🔬 骨幹掃描: {len(candidates)} 個候選，目標準確率 {target_accuracy:.2%}")
+    SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for backbone, input_size in candidates:
+        name = f"{backbone}_{input_size}"
+        print(f"\n--- {name} ---")
+        model = build_model(len(CATEGORIES), backbone, input_size)
+        if cached_features:
+            train_with_feature_cache(model, variants=variants, deduplicate=deduplicate,
+                                     version=backbone_version(backbone, input_size))
+        else:
+            train_model(model, train_ds, val_ds, train_samples)
+
+        _, val_acc = model.evaluate(val_ds, verbose=0)
+        path = SWEEP_DIR / name / "model.keras"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        model.save(path)
+        size_bytes, size_format = export_candidate(model, path.parent)
+        results.append({
+            "name": name,
+            "backbone": backbone,
+            "input_size": input_size,
+            "val_accuracy": float(val_acc),
+            "latency_ms": measure_latency(model),
+            "size_bytes": size_bytes,
+            "size_format": size_format,
+            "params": int(model.count_params()),
+            "path": str(path),
+        })
+        print(f"  ✅ {name}: 準確率 {val_acc:.2%}, 延遲 {results[-1]['latency_ms']:.1f} ms, "
+              f"大小 {results[-1]['size_bytes'] / 1e6:.1f} MB")
+        tf.keras.backend.clear_session()
+
+    pareto_front(results)
+    chosen = select_backbone(results, target_accuracy)
+
+    print("\n📊 骨幹掃描結果 (* = Pareto 前緣, > = 選用):")
+    print(f"  {'':2}{'候選':<26}{'準確率':>8}{'延遲 ms':>10}{'大小 MB':>10}{'格式':>8}{'參數':>12}")
+    for r in sorted(results, key=lambda r: r["size_bytes"]):
+        mark = (">" if r is chosen else " ") + ("*" if r["pareto"] else " ")
+        print(f"  {mark}{r['name']:<26}{r['val_accuracy']:>8.2%}{r['latency_ms']:>10.1f}"
+              f"{r['size_bytes'] / 1e6:>10.1f}{r['size_format']:>8}{r['params']:>12,}")
+    if len({r["size_format"] for r in results}) > 1:
+        print("  ⚠️ 部分候選只能量測 TFLite 大小，與 TF.js 大小不能直接比較")
+
+    report_path = SWEEP_DIR / "sweep_report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({"target_accuracy": target_accuracy, "chosen": chosen["name"], "results": results},
+                  f, ensure_ascii=False, indent=2)
+    print(f"\n  選用: {chosen['name']} (報告: {report_path})")
+
+    return chosen, results
+
+
+def export_to_tfjs(model, model_dir=MODEL_DIR, labels=CATEGORIES):
+    """匯出為 TensorFlow.js 格式 (model_dir 預設 docs/model；labels 寫入 labels.json)"""
     print("\n📦 匯出為 TensorFlow.js 格式...")
     
     # 確保目錄存在
-    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    # 清掉上一次匯出 (或 Teachable Machine) 留下的拓撲與權重檔，避免新舊檔案混在一起
+    # (子目錄 graph/、student/ 與 TFLite 模型不受影響；metadata.json 由 write_metadata 覆寫)
+    for stale in [model_dir / "model.json", *model_dir.glob("*.bin")]:
+        if stale.exists():
+            stale.unlink()
+            print(f"  🧹 移除舊檔: {stale.name}")
     
     # 先儲存 Keras 模型
-    keras_path = MODEL_DIR / "model.keras"
+    keras_path = model_dir / "model.keras"
     model.save(keras_path)
     print(f"  ✅ Keras 模型已儲存: {keras_path}")
     
     # 使用 tensorflowjs_converter 轉換
     try:
         import tensorflowjs as tfjs
-        tfjs.converters.save_keras_model(model, str(MODEL_DIR))
-        print(f"  ✅ TensorFlow.js 模型已匯出: {MODEL_DIR}")
+        tfjs.converters.save_keras_model(model, str(model_dir))
+        print(f"  ✅ TensorFlow.js 模型已匯出: {model_dir}")
     except Exception as e:
         print(f"  ⚠️ TensorFlow.js 匯出失敗: {e}")
         print("  請手動執行:")
-        print(f"  tensorflowjs_converter --input_format=keras {keras_path} {MODEL_DIR}")
+        print(f"  tensorflowjs_converter --input_format=keras {keras_path} {model_dir}")
     
     # 儲存類別標籤
-    labels_path = MODEL_DIR / "labels.json"
+    labels_path = model_dir / "labels.json"
     with open(labels_path, 'w', encoding='utf-8') as f:
-        json.dump(CATEGORIES, f, ensure_ascii=False, indent=2)
+        json.dump(labels, f, ensure_ascii=False, indent=2)
     print(f"  ✅ 類別標籤已儲存: {labels_path}")
+    write_metadata(model_dir, labels)
+
+
+def write_metadata(model_dir, labels=CATEGORIES):
+    """
+    寫入本專案的 metadata.json (取代同目錄中過時的 Teachable Machine metadata.json)。
+    inputScale / inputOffset 明確記錄輸入縮放 (本專案以 rescale 1/255 訓練)，
+    tfjs_model.input_scaling 會優先讀取，不再依檔案猜測 [-1, 1] 或 [0, 1]。
+    """
+    metadata = {
+        "packageName": "smartrecycle",
+        "labels": labels,
+        "imageSize": IMAGE_SIZE[0],
+        "inputScale": 1.0 / 255.0,
+        "inputOffset": 0.0,
+    }
+    metadata_path = model_dir / "metadata.json"
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    print(f"  ✅ 輸入縮放已記錄: {metadata_path}")
+
+
+def export_to_tfjs_graph(model):
+    """
+    匯出 TensorFlow.js graph-model (docs/model/graph/)。
+    以推論模式 (training=False) 凍結成常數圖，再交給 tensorflowjs 的 Grappler 最佳化:
+    BatchNorm 折疊進卷積權重、卷積 + bias + ReLU6 融合成單一 op。
+    瀏覽器端不需重建 Keras 層，也不受 Keras 3 / TF.js 拓撲格式差異 (fix_model.py) 影響。
+    """
+    print("\n📦 匯出為 TensorFlow.js graph-model...")
+    GRAPH_MODEL_DIR.mkdir(parents=True, exist_ok=True)
+
+    @tf.function(input_signature=[tf.TensorSpec([None, *IMAGE_SIZE, 3], tf.float32, name="image")])
+    def serve(image):
+        return {"scores": model(image, training=False)}
+
+    saved_model_dir = MODEL_DIR / "saved_model"
+    if saved_model_dir.exists():
+        shutil.rmtree(saved_model_dir)
+    tf.saved_model.save(model, str(saved_model_dir), signatures={"serving_default": serve})
+
+    try:
+        import tensorflowjs as tfjs
+        tfjs.converters.convert_tf_saved_model(str(saved_model_dir), str(GRAPH_MODEL_DIR),
+                                               signature_def="serving_default",
+                                               saved_model_tags="serve")
+    except Exception as e:
+        print(f"  ⚠️ graph-model 匯出失敗: {e}")
+        print("  請手動執行:")
+        print(f"  tensorflowjs_converter --input_format=tf_saved_model --output_format=tfjs_graph_model "
+              f"{saved_model_dir} {GRAPH_MODEL_DIR}")
+        return
+    finally:
+        shutil.rmtree(saved_model_dir, ignore_errors=True)
+
+    # 檢查融合結果: 不應再有獨立的 BatchNorm
+    with open(GRAPH_MODEL_DIR / "model.json", 'r', encoding='utf-8') as f:
+        nodes = json.load(f)["modelTopology"]["node"]
+    ops = {}
+    for node in nodes:
+        ops[node["op"]] = ops.get(node["op"], 0) + 1
+    fused = sum(n for op, n in ops.items() if op.startswith("_Fused") or op.startswith("Fused"))
+    unfused_bn = sum(n for op, n in ops.items() if "BatchNorm" in op)
+    print(f"  ✅ graph-model 已匯出: {GRAPH_MODEL_DIR} ({len(nodes)} 個節點，融合 op {fused} 個)")
+    if unfused_bn:
+        print(f"  ⚠️ 仍有 {unfused_bn} 個未折疊的 BatchNorm")
+
+    with open(GRAPH_MODEL_DIR / "labels.json", 'w', encoding='utf-8') as f:
+        json.dump(CATEGORIES, f, ensure_ascii=False, indent=2)
+    write_metadata(GRAPH_MODEL_DIR)
+
+
+def representative_dataset(num_samples=TFLITE_CALIBRATION_SAMPLES, seed=0):
+    """int8 量化校正資料: 從 train/ 各類別隨機抽樣，前處理與訓練相同 (rescale 1/255)"""
+    paths = []
+    for cat in CATEGORIES:
+        cat_dir = TRAIN_DIR / cat
+        if cat_dir.exists():
+            paths += [p for p in cat_dir.iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png')]
+    random.Random(seed).shuffle(paths)
+
+    def generator():
+        for path in paths[:num_samples]:
+            img = tf.io.decode_image(tf.io.read_file(str(path)), channels=3, expand_animations=False)
+            img = tf.image.resize(img, IMAGE_SIZE) / 255.0
+            yield [tf.expand_dims(tf.cast(img, tf.float32), 0)]
+
+    return generator
+
+
+def export_to_tflite(model, val_ds):
+    """匯出 float16 與 full-int8 TFLite 模型，並在驗證集上比較與 float32 模型的準確率差異"""
+    from tflite_engine import TFLiteEngine
+
+    print("\n📦 匯出為 TFLite 格式...")
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+
+    # float16: 權重減半，計算仍為 float
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    float16_path = MODEL_DIR / "model_float16.tflite"
+    float16_path.write_bytes(converter.convert())
+    print(f"  ✅ float16 模型: {float16_path}")
+
+    # full int8: 權重與激活值皆為 int8，用 train/ 樣本校正
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset()
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    converter.inference_output_type = tf.uint8
+    int8_path = MODEL_DIR / "model_int8.tflite"
+    int8_path.write_bytes(converter.convert())
+    print(f"  ✅ int8 模型: {int8_path}")
+
+    # 準確率差異報告 (所有模型使用同一批驗證影像)
+    print("\n📈 TFLite 準確率比較 (驗證集)...")
+    images, labels = [], []
+    for x, y in val_ds:
+        images.append(x.numpy())
+        labels.append(np.argmax(y.numpy(), axis=1))
+    labels = np.concatenate(labels)
+
+    float_pred = np.concatenate([model(x, training=False).numpy() for x in images]).argmax(axis=1)
+    float_acc = float(np.mean(float_pred == labels))
+
+    keras_path = MODEL_DIR / "model.keras"
+    report = {
+        "samples": int(len(labels)),
+        "float32": {
+            "accuracy": float_acc,
+            "size_bytes": keras_path.stat().st_size if keras_path.exists() else None,
+        },
+    }
+    print(f"  float32: {float_acc:.2%}")
+
+    for name, path in (("float16", float16_path), ("int8", int8_path)):
+        engine = TFLiteEngine(path)
+        pred = np.concatenate([engine.run(x) for x in images]).argmax(axis=1)
+        acc = float(np.mean(pred == labels))
+        report[name] = {
+            "accuracy": acc,
+            "accuracy_delta": acc - float_acc,
+            "agreement_with_float32": float(np.mean(pred == float_pred)),
+            "size_bytes": path.stat().st_size,
+        }
+        print(f"  {name}: {acc:.2%} (差異 {acc - float_acc:+.2%}, {path.stat().st_size / 1024:.0f} KB)")
+
+    report_path = MODEL_DIR / "tflite_report.json"
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"  ✅ 報告已儲存: {report_path}")
+
+    return report
 
 
 def main():
+    parser = argparse.ArgumentParser(description="SmartRecycle AI - 模型訓練")
+    parser.add_argument("--cached-features", action="store_true",
+                        help="骨幹特徵快取模式: 只計算新圖片的骨幹特徵，直接訓練頂層")
+    parser.add_argument("--variants", type=int, default=FEATURE_VARIANTS,
+                        help="特徵快取模式下每張圖片的增強版本數")
+    parser.add_argument("--cache", choices=["memory", "disk", "none"], default="memory",
+                        help="快取解碼後的影像 (記憶體 / 磁碟 .tfdata_cache / 不快取)")
+    parser.add_argument("--shards", action="store_true",
+                        help="從預先解碼的 uint8 張量分片 (.shards/) 讀取訓練資料")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="不去除重複圖片 (預設依 train/.manifest.json 去重)")
+    parser.add_argument("--backbone", choices=list(BACKBONES), default=DEFAULT_BACKBONE,
+                        help="骨幹網路 (MobileNetV2 寬度倍率 alpha 或 MobileNetV3)")
+    parser.add_argument("--input-size", type=int, choices=INPUT_SIZES, default=IMAGE_SIZE[0],
+                        help="骨幹的輸入邊長 (模型仍接收 224x224，在模型內縮放)")
+    parser.add_argument("--sweep", action="store_true",
+                        help="骨幹掃描: 訓練每個候選，量測 CPU 延遲與大小，選出達到目標準確率的最小模型")
+    parser.add_argument("--backbones", nargs="+", choices=list(BACKBONES), default=list(BACKBONES),
+                        help="骨幹掃描的候選骨幹")
+    parser.add_argument("--input-sizes", nargs="+", type=int, choices=INPUT_SIZES, default=list(INPUT_SIZES),
+                        help="骨幹掃描的候選輸入尺寸")
+    parser.add_argument("--target-accuracy", type=float, default=0.9,
+                        help="骨幹掃描的目標驗證準確率")
+    args = parser.parse_args()
+    deduplicate = not args.keep_duplicates
+
     print("="*60)
     print("🗑️ SmartRecycle AI - 模型訓練")
     print("="*60)
     
     # 1. 準備資料
-    train_gen, val_gen = prepare_data()
-    
-    # 2. 建立模型
-    model = build_model(num_classes=len(CATEGORIES))
-    
-    # 3. 訓練模型
-    history = train_model(model, train_gen, val_gen)
+    train_ds, val_ds, train_samples = prepare_data(cache=None if args.cache == "none" else args.cache,
+                                                  deduplicate=deduplicate, shards=args.shards)
     
-    # 4. 評估
-    print("\n📈 訓練結果:")
-    final_acc = history.history['accuracy'][-1]
-    final_val_acc = history.history['val_accuracy'][-1]
-    print(f"  訓練準確率: {final_acc:.2%}")
-    print(f"  驗證準確率: {final_val_acc:.2%}")
+    if args.sweep:
+        # 2-4. 骨幹掃描: 訓練並評估每個候選，載入選用的模型
+        candidates = [(backbone, size) for backbone in args.backbones for size in args.input_sizes]
+        chosen, _ = sweep_backbones(candidates, train_ds, val_ds, train_samples, args.target_accuracy,
+                                    cached_features=args.cached_features, variants=args.variants,
+                                    deduplicate=deduplicate)
+        model = tf.keras.models.load_model(chosen["path"])
+    else:
+        # 2. 建立模型
+        model = build_model(len(CATEGORIES), args.backbone, args.input_size)
+        
+        # 3. 訓練模型
+        if args.cached_features:
+            history = train_with_feature_cache(model, variants=args.variants, deduplicate=deduplicate,
+                                               version=backbone_version(args.backbone, args.input_size))
+        else:
+            history = train_model(model, train_ds, val_ds, train_samples)
+        
+        # 4. 評估
+        print("\n📈 訓練結果:")
+        final_acc = history.history['accuracy'][-1]
+        final_val_acc = history.history['val_accuracy'][-1]
+        print(f"  訓練準確率: {final_acc:.2%}")
+        print(f"  驗證準確率: {final_val_acc:.2%}")
     
     # 5. 匯出
     export_to_tfjs(model)
+    export_to_tfjs_graph(model)
+    export_to_tflite(model, val_ds)
     
     # 6. 清理暫存
     if os.path.exists('best_model.keras'):
@@ -224,8 +686,10 @@ def main():
     print("="*60)
     print(f"\n模型已匯出至: {MODEL_DIR}")
     print("\n下一步:")
-    print("1. 更新 docs/config.js 中的 MODEL.IS_CUSTOM_MODEL = true")
+    print("1. 更新 docs/js/config.js: MODEL.IS_TEACHABLE_MACHINE = false、MODEL.IS_CUSTOM_MODEL = true "
+          "(預設載入 graph-model)")
     print("2. 部署到 GitHub Pages")
+    print("3. 邊緣裝置: python main.py --model docs/model --engine tflite")
 
 
 if __name__ == "__main__":
@@ -10,9 +10,11 @@ WSL 訓練腳本 - 使用 TensorFlow 2.10 訓練並匯出 TFJS 格式
 
 執行:
     python train_wsl.py
+    python train_wsl.py --shards   # 從預先解碼的張量分片訓練 (先執行 python tensor_shards.py)
 """
 
 import os
+import sys
 import json
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 減少警告
 
@@ -61,25 +63,39 @@ def main():
         validation_split=0.2
     )
     
-    train_gen = datagen.flow_from_directory(
-        TRAIN_DIR,
-        target_size=IMAGE_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        classes=CATEGORIES,
-        subset='training'
-    )
+    fit_steps = {}
+    if '--shards' in sys.argv:
+        # 預先解碼的 uint8 張量分片 (mmap 讀取，不再解碼 JPEG)
+        from tensor_shards import SHARD_DIR, ShardedSplit, keras_batches, steps
+        train_split = ShardedSplit(SHARD_DIR, "train")
+        val_split = ShardedSplit(SHARD_DIR, "val")
+        if train_split.categories != CATEGORIES:
+            print(f"  ❌ 分片類別 {train_split.categories} 與 CATEGORIES 不符，請重新執行 tensor_shards.py --categories ...")
+            return
+        train_gen = keras_batches(train_split, BATCH_SIZE, shuffle=True, transform=datagen.random_transform)
+        val_gen = keras_batches(val_split, BATCH_SIZE)
+        fit_steps = dict(steps_per_epoch=steps(train_split, BATCH_SIZE), validation_steps=steps(val_split, BATCH_SIZE))
+        print(f"\n  訓練: {len(train_split)}, 驗證: {len(val_split)} (張量分片)")
+    else:
+        train_gen = datagen.flow_from_directory(
+            TRAIN_DIR,
+            target_size=IMAGE_SIZE,
+            batch_size=BATCH_SIZE,
+            class_mode='categorical',
+            classes=CATEGORIES,
+            subset='training'
+        )
     
-    val_gen = datagen.flow_from_directory(
-        TRAIN_DIR,
-        target_size=IMAGE_SIZE,
-        batch_size=BATCH_SIZE,
-        class_mode='categorical',
-        classes=CATEGORIES,
-        subset='validation'
-    )
+        val_gen = datagen.flow_from_directory(
+            TRAIN_DIR,
+            target_size=IMAGE_SIZE,
+            batch_size=BATCH_SIZE,
+            class_mode='categorical',
+            classes=CATEGORIES,
+            subset='validation'
+        )
     
-    print(f"\n  訓練: {train_gen.samples}, 驗證: {val_gen.samples}")
+        print(f"\n  訓練: {train_gen.samples}, 驗證: {val_gen.samples}")
     
     # 建立模型
     print("\n🏗️ 建立模型...")
@@ -106,7 +122,8 @@ def main():
         epochs=EPOCHS,
         validation_data=val_gen,
         callbacks=[EarlyStopping(patience=3, restore_best_weights=True)],
-        verbose=1
+        verbose=1,
+        **fit_steps
     )
     
     print(f"\n📈 最終準確率: {history.history['val_accuracy'][-1]:.2%}")